@@ -1,28 +1,540 @@
 # src/app.py
 from datetime import date, datetime, timedelta
-import csv, io
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import closing, contextmanager
+from functools import wraps
+import csv, hashlib, io, math, os, re, threading, time, zlib
+import click
+from jinja2 import FileSystemBytecodeCache
 import pymysql
+from pymysql.constants import CLIENT
 from flask import (
     Flask, render_template, request, redirect, url_for,
-    flash, jsonify, Response
+    flash, jsonify, Response, g, has_app_context, make_response
 )
 
 app = Flask(__name__, template_folder="templates", static_folder="static", static_url_path="/static")
-app.secret_key = "dev-change-this"
-
-# ----- DB CONFIG (XAMPP MySQL on 3306) -----
+app.secret_key = os.getenv("MYWALLET_SECRET_KEY", "dev-change-this")
+
+# ----- INSTRUMENTATION -----
+# Queries are named by a leading /* q:name */ tag (also visible in the MySQL
+# slow log and processlist); untagged statements get "<verb>_<table>".
+SLOW_QUERY_MS = float(os.getenv("MYWALLET_SLOW_QUERY_MS", "200"))
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_QUERY_TAG = re.compile(r"/\* q:(\w+) \*/")
+_QUERY_SHAPE = re.compile(r"\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE)\b(?:.*?\b(?:FROM|INTO)\b)?\s*`?(\w+)", re.I | re.S)
+
+def query_name(sql: str) -> str:
+    tags = _QUERY_TAG.findall(sql)
+    if tags:
+        return "+".join(tags)
+    m = _QUERY_SHAPE.match(sql)
+    return f"{m.group(1).lower()}_{m.group(2).lower()}" if m else "other"
+
+class Histogram:
+    """Prometheus-style cumulative histogram over LATENCY_BUCKETS (caller locks)."""
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+class Metrics:
+    """Process-wide request/query metrics, rendered at /metrics."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}        # (route, method) -> Histogram
+        self.statuses = {}        # (route, method, status) -> count
+        self.queries = {}         # name -> Histogram
+        self.query_rows = {}      # name -> rows returned/affected
+
+    def observe_request(self, route: str, method: str, status: int, seconds: float):
+        with self._lock:
+            self.requests.setdefault((route, method), Histogram()).observe(seconds)
+            key = (route, method, str(status))
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def observe_query(self, name: str, seconds: float, rows: int):
+        with self._lock:
+            self.queries.setdefault(name, Histogram()).observe(seconds)
+            self.query_rows[name] = self.query_rows.get(name, 0) + max(rows, 0)
+
+    def add_query_rows(self, name: str, rows: int):
+        """Rows of a streamed (unbuffered) statement, counted once they are all read."""
+        with self._lock:
+            self.query_rows[name] = self.query_rows.get(name, 0) + rows
+
+    def render(self, gauges: dict) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        out = []
+
+        def histogram(metric, help_text, series):
+            out.append(f"# HELP {metric} {help_text}")
+            out.append(f"# TYPE {metric} histogram")
+            for labels, h in series:
+                cumulative = 0
+                for le, n in zip((*LATENCY_BUCKETS, "+Inf"), h.counts):
+                    cumulative += n
+                    out.append(f'{metric}_bucket{{{labels},le="{le}"}} {cumulative}')
+                out.append(f"{metric}_sum{{{labels}}} {h.sum:.6f}")
+                out.append(f"{metric}_count{{{labels}}} {h.count}")
+
+        def counter(metric, help_text, series):
+            out.append(f"# HELP {metric} {help_text}")
+            out.append(f"# TYPE {metric} counter")
+            for labels, v in series:
+                out.append(f"{metric}{{{labels}}} {v}")
+
+        with self._lock:
+            histogram("mywallet_http_request_duration_seconds", "Time to produce a response, by route.",
+                      [(f'route="{_label(r)}",method="{m}"', h) for (r, m), h in sorted(self.requests.items())])
+            counter("mywallet_http_requests_total", "Responses by route and status.",
+                    [(f'route="{_label(r)}",method="{m}",status="{st}"', n) for (r, m, st), n in sorted(self.statuses.items())])
+            histogram("mywallet_db_query_duration_seconds", "Statement round-trip time, by query name.",
+                      [(f'query="{_label(q)}"', h) for q, h in sorted(self.queries.items())])
+            counter("mywallet_db_query_rows_total", "Rows returned (SELECT) or affected, by query name.",
+                    [(f'query="{_label(q)}"', n) for q, n in sorted(self.query_rows.items())])
+        for metric, (help_text, value) in gauges.items():
+            out.append(f"# HELP {metric} {help_text}")
+            out.append(f"# TYPE {metric} gauge")
+            out.append(f"{metric} {value}")
+        return "\n".join(out) + "\n"
+
+def _label(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+metrics = Metrics()
+query_listeners = []   # callables(sql) told about every statement sent (db_test.py's EXPLAIN check)
+
+class _CountingMixin:
+    """Times every statement: per-query metrics, per-request totals in g, slow-query log."""
+    unbuffered = False   # rowcount is meaningless until the rows are read; the reader counts them
+
+    def execute(self, query, args=None):
+        if query_listeners:
+            sql = self.mogrify(query, args)
+            for listener in query_listeners:
+                listener(sql)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            elapsed = time.perf_counter() - started
+            name = query_name(query)
+            rows = None if self.unbuffered else self.rowcount
+            metrics.observe_query(name, elapsed, rows if rows is not None else 0)
+            if has_app_context():
+                g.db_queries = g.get("db_queries", 0) + 1
+                g.db_seconds = g.get("db_seconds", 0.0) + elapsed
+            if elapsed * 1000 >= SLOW_QUERY_MS:
+                app.logger.warning("slow query %s: %.1f ms, %s rows: %s", name, elapsed * 1000,
+                                   "streamed" if rows is None else rows, " ".join(str(query).split())[:500])
+
+class CountingCursor(_CountingMixin, pymysql.cursors.DictCursor):
+    pass
+
+class CountingSSCursor(_CountingMixin, pymysql.cursors.SSCursor):
+    unbuffered = True
+
+# ----- DB CONFIG (XAMPP MySQL on 3306; MYWALLET_DB_* env vars override) -----
 CFG = {
-    "host": "127.0.0.1",
-    "port": 3306,                         # XAMPP default
-    "user": "expense_user",
-    "password": "StrongPassword123!",     # <-- put your real password
-    "database": "expense_db",
-    "cursorclass": pymysql.cursors.DictCursor,
+    "host": os.getenv("MYWALLET_DB_HOST", "127.0.0.1"),
+    "port": int(os.getenv("MYWALLET_DB_PORT", "3306")),                 # XAMPP default
+    "user": os.getenv("MYWALLET_DB_USER", "expense_user"),
+    "password": os.getenv("MYWALLET_DB_PASSWORD", "StrongPassword123!"),  # <-- put your real password
+    "database": os.getenv("MYWALLET_DB_NAME", "expense_db"),
+    "cursorclass": CountingCursor,
     "charset": "utf8mb4",
     "autocommit": True,
 }
+
+# ----- CONNECTION POOL -----
+POOL_SIZE      = int(os.getenv("MYWALLET_POOL_SIZE", "10"))          # max open connections
+POOL_TIMEOUT   = float(os.getenv("MYWALLET_POOL_TIMEOUT", "5"))      # seconds to wait for a free one
+POOL_MAX_IDLE  = float(os.getenv("MYWALLET_POOL_MAX_IDLE", "300"))   # close connections idle longer than this
+POOL_PING_IDLE = float(os.getenv("MYWALLET_POOL_PING_IDLE", "30"))   # ping before reuse after this much idle
+BATCH_POOL_SIZE = int(os.getenv("MYWALLET_BATCH_POOL_SIZE", "2"))    # multi-statement connections for run_batch()
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within the wait timeout."""
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of PyMySQL connections.
+
+    Idle connections are reused LIFO so the hot ones stay warm and the cold
+    ones age out past ``max_idle``; a connection that sat idle longer than
+    ``ping_idle`` is pinged (and transparently reconnected) before reuse.
+    """
+    def __init__(self, cfg: dict, size: int, timeout: float, max_idle: float, ping_idle: float):
+        self.cfg = cfg
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.ping_idle = ping_idle
+        self._idle = deque()          # (conn, last_used), oldest on the left
+        self._cond = threading.Condition()
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._counters = {"created": 0, "checkouts": 0, "timeouts": 0, "evicted": 0, "discarded": 0}
+
+    def _evict_idle(self):
+        """Pop connections idle past max_idle (caller holds the lock, closes them)."""
+        stale, now = [], time.monotonic()
+        while self._idle and now - self._idle[0][1] > self.max_idle:
+            stale.append(self._idle.popleft()[0])
+        self._open -= len(stale)
+        self._counters["evicted"] += len(stale)
+        return stale
+
+    def acquire(self, timeout: float = None):
+        """Check out a connection, waiting up to timeout (default: the pool's).
+
+        timeout=0 never waits: it returns None if no connection is free.
+        """
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._cond:
+            stale = self._evict_idle()
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    conn, last_used = None, None
+                    self._open += 1
+                    break
+                if timeout == 0:
+                    conn = False            # nothing free and not waiting
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolTimeout(f"no DB connection free within {self.timeout:g}s (pool size {self.size})")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            if conn is not False:
+                self._in_use += 1
+                self._counters["checkouts"] += 1
+        for c in stale:
+            _close_quietly(c)
+        if conn is False:
+            return None
+
+        try:
+            if conn is None:
+                conn = pymysql.connect(**self.cfg)
+                with self._cond:
+                    self._counters["created"] += 1
+            elif time.monotonic() - last_used > self.ping_idle:
+                conn.ping(reconnect=True)
+        except Exception:
+            self._forget(conn)
+            raise
+        return conn
+
+    def release(self, conn, broken: bool = False):
+        if broken or not conn.open:
+            self._forget(conn)
+            return
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _forget(self, conn):
+        """Drop a checked-out connection that must not go back to the pool."""
+        if conn is not None:
+            _close_quietly(conn)
+        with self._cond:
+            self._open -= 1
+            self._in_use -= 1
+            self._counters["discarded"] += 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of a ``with`` block."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            self.release(conn, broken=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close_idle(self) -> int:
+        """Close every idle connection (used on shutdown); returns how many."""
+        with self._cond:
+            idle = [c for c, _ in self._idle]
+            self._idle.clear()
+            self._open -= len(idle)
+        for c in idle:
+            _close_quietly(c)
+        return len(idle)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"size": self.size, "open": self._open, "in_use": self._in_use,
+                    "idle": len(self._idle), "waiting": self._waiting, **self._counters}
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+pool = ConnectionPool(CFG, POOL_SIZE, POOL_TIMEOUT, POOL_MAX_IDLE, POOL_PING_IDLE)
+# Only run_batch() uses these, so stacked statements are never allowed on the
+# connections that run everything else.
+batch_pool = ConnectionPool({**CFG, "client_flag": CLIENT.MULTI_STATEMENTS},
+                            BATCH_POOL_SIZE, POOL_TIMEOUT, POOL_MAX_IDLE, POOL_PING_IDLE)
+
 def get_conn():
-    return pymysql.connect(**CFG)
+    """The current request's connection: checked out on first use, released on teardown."""
+    if "db_conn" not in g:
+        g.db_conn = pool.acquire()
+    return g.db_conn
+
+@app.teardown_appcontext
+def release_conn(exc):
+    conn = g.pop("db_conn", None)
+    if conn is not None:
+        pool.release(conn, broken=isinstance(exc, (pymysql.err.OperationalError, pymysql.err.InterfaceError)))
+
+@contextmanager
+def transaction():
+    """Run a block as one transaction on the request's connection; yields a cursor."""
+    conn = get_conn()
+    conn.begin()
+    try:
+        with conn.cursor() as cur:
+            yield cur
+            version = bump_data_version(cur)   # committed together with the write
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    remember_data_version(version["epoch"], version["version"])
+
+def run_batch(cur, statements):
+    """Send several (sql, params) SELECTs in one round-trip; returns one row list per statement.
+
+    Params are escaped client-side with mogrify(), so this is only for the
+    app's own parameterised SQL, never for SQL text built from user input.
+    The batch goes out on a batch_pool connection; cur (the request's
+    connection) runs a lone statement, or each statement in turn when every
+    batch connection is busy.
+    """
+    conn = batch_pool.acquire(timeout=0) if len(statements) > 1 else None
+    if conn is None:
+        results = []
+        for sql, p in statements:
+            cur.execute(sql, p if p is not None else ())
+            results.append(cur.fetchall())
+        return results
+    broken = True
+    try:
+        with conn.cursor() as bcur:
+            bcur.execute(";\n".join(bcur.mogrify(q.strip().rstrip(";"), p if p is not None else ())
+                                     for q, p in statements))
+            results = [bcur.fetchall()]
+            while bcur.nextset():
+                results.append(bcur.fetchall())
+        broken = False
+    finally:
+        batch_pool.release(conn, broken=broken)
+    return results
+
+@app.errorhandler(PoolTimeout)
+def pool_timeout(e):
+    return {"status": "busy", "error": str(e)}, 503
+
+# ---------- PARALLEL QUERIES ----------
+# run_batch() saves round-trips, but MySQL still runs the statements one after
+# another on that connection. parallel_queries() runs independent SELECTs at
+# the same time on separate pooled connections, so a page waits for its
+# slowest query instead of the sum of them.
+QUERY_WORKERS  = int(os.getenv("MYWALLET_QUERY_WORKERS", "8"))      # worker threads, whole process
+QUERY_PARALLEL = int(os.getenv("MYWALLET_QUERY_PARALLEL", "3"))     # statements in flight per request (1 = off)
+QUERY_TIMEOUT  = float(os.getenv("MYWALLET_QUERY_TIMEOUT", "10"))   # seconds for one parallel_queries() call
+
+class QueryTimeout(Exception):
+    """A parallel_queries() group did not finish within QUERY_TIMEOUT."""
+
+_query_executor = ThreadPoolExecutor(max(1, QUERY_WORKERS), thread_name_prefix="mywallet-query")
+
+def _pooled_select(sql, params, group: dict, name: str):
+    """Worker: run one SELECT on its own pooled connection -> (rows, seconds), or None if none is free."""
+    conn = pool.acquire(timeout=0)
+    if conn is None:
+        return None
+    with group["lock"]:                     # registered only while checked out, so KILL never hits a reused connection
+        if group["stopped"]:
+            pool.release(conn)
+            return None
+        group["running"][name] = conn.thread_id()
+    broken = False
+    try:
+        started = time.perf_counter()
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        return rows, time.perf_counter() - started
+    except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+        broken = True
+        raise
+    finally:
+        with group["lock"]:
+            group["running"].pop(name, None)
+        pool.release(conn, broken=broken)
+
+def parallel_queries(statements: dict) -> dict:
+    """Run independent {name: (sql, params)} SELECTs concurrently; returns {name: rows}.
+
+    The first statement runs here on the request's connection, the others on
+    worker threads with a pooled connection each, at most QUERY_PARALLEL at a
+    time. A statement that finds the pool empty is run here afterwards instead,
+    so a busy pool degrades to run_batch() rather than queueing for
+    connections. Raises QueryTimeout after QUERY_TIMEOUT and kills whatever is
+    still running.
+    """
+    items = [(name, sql, p if p is not None else ()) for name, (sql, p) in statements.items()]
+    if QUERY_PARALLEL <= 1 or len(items) == 1:
+        with get_conn().cursor() as cur:
+            return dict(zip(statements, run_batch(cur, [(sql, p) for _, sql, p in items])))
+
+    deadline = time.monotonic() + QUERY_TIMEOUT
+    queued, futures, results, leftovers = deque(items[1:]), {}, {}, []
+    group = {"lock": threading.Lock(), "running": {}, "stopped": False}
+
+    def submit():
+        while queued and len(futures) < QUERY_PARALLEL - 1:
+            name, sql, p = queued.popleft()
+            futures[_query_executor.submit(_pooled_select, sql, p, group, name)] = name
+
+    submit()
+    name, sql, p = items[0]
+    try:
+        with get_conn().cursor() as cur:
+            cur.execute(sql, p)
+            results[name] = cur.fetchall()
+        while futures:
+            done, _ = wait(futures, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                raise QueryTimeout(f"queries {', '.join(sorted(futures.values()))} still running "
+                                   f"after {QUERY_TIMEOUT:g}s")
+            for f in done:
+                name = futures.pop(f)
+                out = f.result()
+                if out is None:
+                    leftovers.append(name)
+                    continue
+                results[name], seconds = out
+                g.db_queries = g.get("db_queries", 0) + 1      # workers have no app context
+                g.db_seconds = g.get("db_seconds", 0.0) + seconds
+            submit()
+    except BaseException:
+        for f in futures:
+            f.cancel()
+        with group["lock"]:
+            group["stopped"] = True
+            for thread_id in group["running"].values():
+                try:
+                    with get_conn().cursor() as cur:
+                        cur.execute("KILL QUERY %s", (thread_id,))
+                except pymysql.err.Error:
+                    pass
+        raise
+
+    if leftovers:
+        wanted = {name: (sql, p) for name, sql, p in items if name in leftovers}
+        with get_conn().cursor() as cur:
+            results.update(zip(wanted, run_batch(cur, list(wanted.values()))))
+    return {name: results[name] for name in statements}
+
+@app.errorhandler(QueryTimeout)
+def query_timeout(e):
+    return {"status": "busy", "error": str(e)}, 503
+
+# ---------- SCHEMA MIGRATIONS ----------
+# Versioned DDL lives in migrations/NNNN_name.sql and is applied in order, each
+# version once, recorded in schema_migrations. Runs at startup (unless
+# MYWALLET_AUTO_MIGRATE=0) and via `flask migrate`.
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+AUTO_MIGRATE = os.getenv("MYWALLET_AUTO_MIGRATE", "1") == "1"
+
+# "table/column/index already exists": lets a database that predates the
+# migrations (or had indexes added by hand) adopt them without failing.
+_ALREADY_APPLIED = {1050, 1060, 1061}
+
+def list_migrations():
+    """[(version, filename)] of migrations on disk, in order."""
+    found = []
+    for fname in sorted(os.listdir(MIGRATIONS_DIR)):
+        head = fname.split("_", 1)[0]
+        if fname.endswith(".sql") and head.isdigit():
+            found.append((int(head), fname))
+    return found
+
+def _split_sql(text: str):
+    """Statements of a migration file: ';'-terminated, '--' comment lines dropped."""
+    lines = [ln for ln in text.splitlines() if not ln.lstrip().startswith("--")]
+    return [st.strip() for st in "\n".join(lines).split(";") if st.strip()]
+
+def migrate():
+    """Apply pending migrations; returns the filenames applied."""
+    applied = []
+    with get_conn().cursor() as cur:
+        cur.execute("SELECT GET_LOCK('mywallet_migrate', 60) AS got")
+        if not cur.fetchone()["got"]:
+            raise RuntimeError("another process is running migrations")
+        try:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version    INT PRIMARY KEY,
+                    name       VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                ) ENGINE=InnoDB
+            """)
+            cur.execute("SELECT version FROM schema_migrations")
+            done = {r["version"] for r in cur.fetchall()}
+            for version, fname in list_migrations():
+                if version in done:
+                    continue
+                with open(os.path.join(MIGRATIONS_DIR, fname), encoding="utf-8") as f:
+                    statements = _split_sql(f.read())
+                for stmt in statements:
+                    try:
+                        cur.execute(stmt)
+                    except pymysql.err.MySQLError as e:
+                        if e.args and e.args[0] in _ALREADY_APPLIED:
+                            continue
+                        raise RuntimeError(f"{fname} failed: {e}") from e
+                cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, fname))
+                applied.append(fname)
+        finally:
+            cur.execute("DO RELEASE_LOCK('mywallet_migrate')")
+    return applied
+
+@app.cli.command("migrate")
+def migrate_cmd():
+    """Apply pending schema migrations."""
+    applied = migrate()
+    print("Applied:", ", ".join(applied) if applied else "nothing (schema up to date)")
 
 # ---------- Helpers ----------
 def parse_ymd(s: str):
@@ -39,54 +551,148 @@ def default_range():
     """Current month: 1st .. today (inclusive)"""
     return month_start_end(date.today())
 
-def get_categories():
+def int_arg(name: str, default: int, lo: int, hi: int):
+    """Query arg as an int clamped to lo..hi; default when missing or malformed."""
+    try:
+        return max(lo, min(hi, int(request.args.get(name, default))))
+    except Exception:
+        return default
+
+def add_months(d: date, n: int):
+    """1st of the month n months after (or before, n < 0) d's month."""
+    y, m = divmod(d.month - 1 + n, 12)
+    return date(d.year + y, m + 1, 1)
+
+# ---- Category cache ----
+# Categories change rarely but every form and list page needs them. Keep them
+# in-process; anything that writes a category calls invalidate_categories(),
+# and the TTL bounds staleness for writes made by other processes.
+CATEGORY_TTL = float(os.getenv("MYWALLET_CATEGORY_TTL", "300"))
+_category_cache = {}          # table -> (expires_at, rows)
+_category_gen = 0             # bumped on invalidation so in-flight loads are not stored
+_category_lock = threading.Lock()
+
+def _cached_categories(table: str):
+    hit = _category_cache.get(table)
+    if hit and hit[0] > time.monotonic():
+        return hit[1]
+    gen = _category_gen
     with get_conn().cursor() as cur:
-        cur.execute("SELECT id, name FROM categories ORDER BY name;")
-        return cur.fetchall()
+        cur.execute(f"/* q:{table} */ SELECT id, name FROM {table} ORDER BY name;")
+        rows = cur.fetchall()
+    with _category_lock:
+        if gen == _category_gen:
+            _category_cache[table] = (time.monotonic() + CATEGORY_TTL, rows)
+    return rows
+
+def invalidate_categories():
+    global _category_gen
+    with _category_lock:
+        _category_gen += 1
+        _category_cache.clear()
+    bump_data_version()   # category names appear in the API payloads
+
+def get_categories():
+    return _cached_categories("categories")
 
 def get_income_categories():
-    with get_conn().cursor() as cur:
-        cur.execute("SELECT id, name FROM income_categories ORDER BY name;")
-        return cur.fetchall()
+    return _cached_categories("income_categories")
 
 def ensure_income_category(label: str):
     """Create an income category if it does not exist (case-insensitive)."""
     with get_conn().cursor() as cur:
-        cur.execute("SELECT id FROM income_categories WHERE LOWER(name)=LOWER(%s) LIMIT 1", (label,))
+        # name uses a case-insensitive collation, so = matches any case and can use the index
+        cur.execute("SELECT id FROM income_categories WHERE name=%s LIMIT 1", (label,))
         if not cur.fetchone():
             cur.execute("INSERT INTO income_categories(name) VALUES (%s)", (label,))
-
-# ---- Flask 3.x safe seeding (no before_first_request) ----
-_SEEDED = False
-def try_seed():
-    global _SEEDED
-    if _SEEDED:
-        return
-    try:
-        ensure_income_category("Tuition fee")
-        _SEEDED = True
-    except Exception as e:
-        print("Seed warning:", e)
-
-def totals_between(d_from: date, d_to: date):
-    """Inclusive range totals + label dict for UI."""
-    if d_from is None or d_to is None or d_from > d_to:
-        d_from, d_to = default_range()
-
-    with get_conn().cursor() as cur:
+            invalidate_categories()
+
+def seed_defaults():
+    """Default rows the UI expects; run once at startup."""
+    ensure_income_category("Tuition fee")
+
+# ---------- DAILY TOTALS ----------
+# One row per (kind, day, category) holding SUM(amount) and COUNT(*) of the raw
+# rows. Every write route adjusts it in the same transaction, so the totals,
+# charts and category breakdowns read a few rows per day instead of every
+# transaction. Created and backfilled by migrations/0003; repair with
+# `flask rebuild-daily-totals`.
+DAILY_TOTALS_UPSERT = """
+    INSERT INTO daily_totals (tx_date, kind, category_id, total, tx_count)
+    VALUES (%s,%s,%s,%s,%s)
+    ON DUPLICATE KEY UPDATE total = total + VALUES(total), tx_count = tx_count + VALUES(tx_count)
+"""
+
+# Expenses also feed category_month_spend (migrations/0005), the month-to-date
+# counter behind budgets; `flask reconcile-budgets` corrects any drift.
+MONTH_SPEND_UPSERT = """
+    INSERT INTO category_month_spend (month, category_id, spent, tx_count)
+    VALUES (%s,%s,%s,%s)
+    ON DUPLICATE KEY UPDATE spent = spent + VALUES(spent), tx_count = tx_count + VALUES(tx_count)
+"""
+
+def month_of(tx_date):
+    """1st of the month for a date or 'YYYY-MM-DD' string."""
+    if not isinstance(tx_date, date):
+        tx_date = datetime.strptime(str(tx_date)[:10], "%Y-%m-%d").date()
+    return tx_date.replace(day=1)
+
+def bump_daily_total(cur, kind: str, tx_date, category_id: int, amount, count: int):
+    """Add amount/count (negative to remove) to one daily_totals bucket (and the month spend)."""
+    cur.execute(DAILY_TOTALS_UPSERT, (tx_date, kind, category_id, amount, count))
+    if kind == "expense":
+        cur.execute(MONTH_SPEND_UPSERT, (month_of(tx_date), category_id, amount, count))
+
+def bump_daily_totals(cur, kind: str, buckets: dict):
+    """Apply {(tx_date, category_id): [amount, count]} in one multi-row upsert."""
+    if buckets:
+        cur.executemany(DAILY_TOTALS_UPSERT, [(d, kind, c, amt, n) for (d, c), (amt, n) in buckets.items()])
+    if buckets and kind == "expense":
+        months = {}
+        for (d, c), (amt, n) in buckets.items():
+            m = months.setdefault((month_of(d), c), [0.0, 0])
+            m[0] += amt
+            m[1] += n
+        cur.executemany(MONTH_SPEND_UPSERT, [(m, c, amt, n) for (m, c), (amt, n) in months.items()])
+
+def rebuild_daily_totals():
+    """Recompute daily_totals from expenses/incomes and their archives in one transaction; returns bucket count."""
+    with transaction() as cur:
+        cur.execute("DELETE FROM daily_totals")
         cur.execute("""
-            SELECT COALESCE(SUM(amount),0) AS total_exp
-            FROM expenses
-            WHERE tx_date >= %s AND tx_date <= %s;
-        """, (d_from, d_to))
-        total_exp = float(cur.fetchone()["total_exp"] or 0)
-
+            INSERT INTO daily_totals (tx_date, kind, category_id, total, tx_count)
+            SELECT tx_date, 'expense', category_id, SUM(amount), COUNT(*)
+            FROM (SELECT tx_date, category_id, amount FROM expenses
+                  UNION ALL SELECT tx_date, category_id, amount FROM expenses_archive) x
+            GROUP BY tx_date, category_id
+        """)
+        n = cur.rowcount
         cur.execute("""
-            SELECT COALESCE(SUM(amount),0) AS total_inc
-            FROM incomes
-            WHERE tx_date >= %s AND tx_date <= %s;
-        """, (d_from, d_to))
-        total_inc = float(cur.fetchone()["total_inc"] or 0)
+            INSERT INTO daily_totals (tx_date, kind, category_id, total, tx_count)
+            SELECT tx_date, 'income', category_id, SUM(amount), COUNT(*)
+            FROM (SELECT tx_date, category_id, amount FROM incomes
+                  UNION ALL SELECT tx_date, category_id, amount FROM incomes_archive) x
+            GROUP BY tx_date, category_id
+        """)
+        return n + cur.rowcount
+
+@app.cli.command("rebuild-daily-totals")
+def rebuild_daily_totals_cmd():
+    """Rebuild the daily_totals rollup from the raw rows."""
+    print(f"daily_totals rebuilt: {rebuild_daily_totals()} buckets")
+
+TOTALS_SQL = """
+    /* q:totals */ SELECT kind, COALESCE(SUM(total),0) AS total
+    FROM daily_totals
+    WHERE kind IN ('expense','income') AND tx_date >= %s AND tx_date <= %s
+    GROUP BY kind;
+"""
+
+def summarize_totals(d_from: date, d_to: date, rows):
+    """TOTALS_SQL rows -> summary dict for the UI."""
+    totals = {r["kind"]: float(r["total"]) for r in rows}
+    total_exp = totals.get("expense", 0.0)
+    total_inc = totals.get("income", 0.0)
 
     return {
         "range_from": d_from.isoformat(),
@@ -97,79 +703,328 @@ def totals_between(d_from: date, d_to: date):
         "net": total_inc - total_exp,
     }
 
+def totals_between(d_from: date, d_to: date):
+    """Inclusive range totals + label dict for UI."""
+    if d_from is None or d_to is None or d_from > d_to:
+        d_from, d_to = default_range()
+
+    with get_conn().cursor() as cur:
+        cur.execute(TOTALS_SQL, (d_from, d_to))
+        return summarize_totals(d_from, d_to, cur.fetchall())
+
 # ---------- PAGES ----------
+# Filter forms on the list pages and the dashboard swap only their table
+# (static/fragments.js). With X-Fragment: 1 or ?fragment=1 a page renders just
+# its partial template, without base.html, the filter form or the category
+# lookup behind it. Compiled templates are kept as bytecode on disk, so a
+# restarted process does not have to re-parse them.
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(os.getenv("MYWALLET_TEMPLATE_CACHE_DIR") or None)
+
+def wants_fragment() -> bool:
+    return request.headers.get("X-Fragment") == "1" or request.args.get("fragment") == "1"
+
+def render_page(page: str, fragment: str, **context):
+    """Render page, or only its fragment template when the client asked for one."""
+    resp = make_response(render_template(fragment if wants_fragment() else page, **context))
+    resp.vary.add("X-Fragment")
+    return resp
+
+def precompile_templates() -> int:
+    """Compile every template into the environment's cache up front; returns how many."""
+    names = app.jinja_env.list_templates(extensions=["html"])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
 @app.route("/")
 def dashboard():
-    try_seed()
     d_from = parse_ymd(request.args.get("from", "")) or None
     d_to   = parse_ymd(request.args.get("to", "")) or None
     if not d_from or not d_to or d_from > d_to:
         d_from, d_to = default_range()
 
-    with get_conn().cursor() as cur:
-        cur.execute("""
-            SELECT e.id, e.tx_date, c.name AS category, e.amount, e.payment_method, e.merchant, e.note
-            FROM expenses e
-            JOIN categories c ON c.id = e.category_id
-            WHERE e.tx_date >= %s AND e.tx_date <= %s
-            ORDER BY e.tx_date DESC, e.id DESC
-            LIMIT 10;
-        """, (d_from, d_to))
-        recent_exp = cur.fetchall()
-
-        cur.execute("""
-            SELECT i.id, i.tx_date, ic.name AS category, i.amount, i.source, i.note
-            FROM incomes i
-            JOIN income_categories ic ON ic.id = i.category_id
-            WHERE i.tx_date >= %s AND i.tx_date <= %s
-            ORDER BY i.tx_date DESC, i.id DESC
-            LIMIT 10;
-        """, (d_from, d_to))
-        recent_inc = cur.fetchall()
-
-    return render_template("home.html",
-                           summary=totals_between(d_from, d_to),
-                           recent_expenses=recent_exp,
-                           recent_incomes=recent_inc)
+    # totals and both recent lists are independent: run them side by side
+    found = parallel_queries({
+        "totals": (TOTALS_SQL, (d_from, d_to)),
+        "recent_expenses": ("""
+                /* q:recent_expenses */ SELECT e.id, e.tx_date, c.name AS category, e.amount, e.payment_method, e.merchant, e.note
+                FROM expenses e
+                JOIN categories c ON c.id = e.category_id
+                WHERE e.tx_date >= %s AND e.tx_date <= %s
+                ORDER BY e.tx_date DESC, e.id DESC
+                LIMIT 10;
+            """, (d_from, d_to)),
+        "recent_incomes": ("""
+                /* q:recent_incomes */ SELECT i.id, i.tx_date, ic.name AS category, i.amount, i.source, i.note
+                FROM incomes i
+                JOIN income_categories ic ON ic.id = i.category_id
+                WHERE i.tx_date >= %s AND i.tx_date <= %s
+                ORDER BY i.tx_date DESC, i.id DESC
+                LIMIT 10;
+            """, (d_from, d_to)),
+    })
+
+    return render_page("home.html", "_dashboard_body.html",
+                       summary=summarize_totals(d_from, d_to, found["totals"]),
+                       budgets=budget_status(date.today().replace(day=1)),
+                       recent_expenses=found["recent_expenses"],
+                       recent_incomes=found["recent_incomes"])
 
 @app.route("/analytics")
 def analytics():
-    try_seed()
     return render_template("analytics.html",
                            default_month=date.today().strftime("%Y-%m"),
                            summary=totals_between(*default_range()))
 
-# ---------- EXPENSES ----------
-@app.route("/expenses")
-def list_expenses():
+# ---------- API CACHE ----------
+# Every committed write (transaction()) and category change bumps the data
+# version, a counter row in the database (migrations/0009), so writes from CLI
+# commands and other server processes count too. The /api/* GETs derive a
+# strong ETag from (version, endpoint, args, today) and answer a matching
+# If-None-Match with 304; otherwise the body is served from a small LRU keyed
+# the same way. The version is held in-process: a process's own writes read
+# the new counter back inside their transaction, and the row is re-read only
+# every DATA_VERSION_TTL seconds to pick up writes made elsewhere. So a 304
+# costs no query, except for the one request per interval that does the re-read.
+API_CACHE_SIZE = int(os.getenv("MYWALLET_API_CACHE_SIZE", "256"))
+DATA_VERSION_TTL = float(os.getenv("MYWALLET_DATA_VERSION_TTL", "5"))
+DATA_VERSION_BUMP = "/* q:data_version_bump */ UPDATE data_version SET version = version + 1 WHERE id = 1"
+DATA_VERSION_SQL = "/* q:data_version */ SELECT epoch, version FROM data_version WHERE id = 1"
+_data_version = None    # (expires_at, epoch, counter) or None
+_data_version_lock = threading.Lock()
+
+class LRUCache:
+    """Thread-safe LRU map with a fixed entry count."""
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+api_cache = LRUCache(API_CACHE_SIZE)
+
+def data_version() -> str:
+    """'epoch.counter' of the shared data version; the database is asked every DATA_VERSION_TTL seconds."""
+    hit = _data_version
+    if not hit or hit[0] <= time.monotonic():
+        with get_conn().cursor() as cur:
+            cur.execute(DATA_VERSION_SQL)
+            row = cur.fetchone()
+        hit = remember_data_version(row["epoch"], row["version"])
+    return f"{hit[1]}.{hit[2]}"
+
+def remember_data_version(epoch: str, counter: int):
+    """Adopt a counter read from the database; never goes back to an older one of the same epoch."""
+    global _data_version
+    with _data_version_lock:
+        old = _data_version
+        if old and old[1] == epoch and old[2] > counter:
+            counter = old[2]         # a concurrent local write already saw a newer value
+        _data_version = (time.monotonic() + DATA_VERSION_TTL, epoch, counter)
+        if old and old[1:] != (epoch, counter):
+            api_cache.clear()    # entries for older versions can never be served again
+        return _data_version
+
+def bump_data_version(cur=None):
+    """Bump the version and return the new row; inside transaction() pass its cursor.
+
+    Without a cursor (a write made outside transaction()) the bump commits on
+    its own and is adopted at once.
+    """
+    if cur is None:
+        with get_conn().cursor() as cur:
+            row = bump_data_version(cur)
+        remember_data_version(row["epoch"], row["version"])
+        return row
+    cur.execute(DATA_VERSION_BUMP)
+    cur.execute(DATA_VERSION_SQL)       # the row is locked by the bump, so this is our own counter
+    return cur.fetchone()
+
+def cached_api(view):
+    """ETag/304 + LRU response cache for a read-only JSON GET view."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = (request.endpoint, tuple(sorted(request.args.items(multi=True))), date.today().isoformat())
+        version = data_version()
+        etag = hashlib.sha1(repr((version, key)).encode()).hexdigest()[:24]
+        if request.if_none_match.contains(etag):
+            resp = Response(status=304)
+        else:
+            hit = api_cache.get((version, key))
+            if hit is None:
+                resp = make_response(view(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+                api_cache.put((version, key), (resp.get_data(), resp.content_type))
+            else:
+                resp = Response(hit[0], content_type=hit[1])
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "no-cache"   # always revalidate; a 304 is nearly free
+        return resp
+    return wrapper
+
+# ---------- LIST PAGING ----------
+# Keyset ("seek") pagination walks the (tx_date, id) / (category_id, tx_date, id)
+# indexes from migrations/0002 instead of OFFSET/LIMIT, so page 1000 costs the
+# same as page 1.
+PAGE_SIZE = int(os.getenv("MYWALLET_PAGE_SIZE", "50"))
+
+def parse_cursor(s: str):
+    """Parse a 'YYYY-MM-DD_id' page cursor -> (date, id) or None"""
+    d, _, i = (s or "").partition("_")
+    d = parse_ymd(d)
+    return (d, int(i)) if d and i.isdigit() else None
+
+def make_cursor(row) -> str:
+    return f"{row['tx_date'].isoformat()}_{row['id']}"
+
+# ?q= text search uses the FULLTEXT indexes from migrations/0004: boolean mode,
+# every word required, each word matched as a prefix. It is one more WHERE
+# predicate, so it combines with the date/category filters and keyset paging.
+SEARCH_COLUMNS = {"e": ("merchant", "note"), "i": ("source", "note")}   # must match the FULLTEXT column lists
+SEARCH_MAX_WORDS = 8
+
+def search_words(q: str):
+    return re.findall(r"\w+", q or "")[:SEARCH_MAX_WORDS]
+
+def search_terms(q: str):
+    """Free text -> '+word* +word*' for MATCH ... IN BOOLEAN MODE; None if no words."""
+    return " ".join(f"+{w}*" for w in search_words(q)) or None
+
+def list_filters(alias: str, fulltext: bool = True):
+    """from/to/category_id/q query args -> (where, params, selected) for a list query.
+
+    fulltext=False matches ?q= words with LIKE instead, for the archive tables,
+    which cannot carry a FULLTEXT index.
+    """
     d_from = parse_ymd(request.args.get("from", "")) or None
     d_to   = parse_ymd(request.args.get("to", "")) or None
     cat_id = request.args.get("category_id")
+    cat_id = int(cat_id) if cat_id and cat_id.isdigit() else None
+    q = request.args.get("q", "").strip()
+    terms = search_terms(q)
 
     where, params = [], []
-    if d_from: where.append("e.tx_date >= %s"); params.append(d_from)
-    if d_to:   where.append("e.tx_date <= %s"); params.append(d_to)
-    if cat_id and cat_id.isdigit():
-        where.append("e.category_id = %s"); params.append(int(cat_id))
-
-    sql = """
-        SELECT e.id, e.tx_date, c.name AS category, e.amount, e.payment_method, e.merchant, e.note
-        FROM expenses e
-        JOIN categories c ON c.id = e.category_id
+    if d_from: where.append(f"{alias}.tx_date >= %s"); params.append(d_from)
+    if d_to:   where.append(f"{alias}.tx_date <= %s"); params.append(d_to)
+    if cat_id is not None:
+        where.append(f"{alias}.category_id = %s"); params.append(cat_id)
+    if terms and fulltext:
+        cols = ", ".join(f"{alias}.{c}" for c in SEARCH_COLUMNS[alias])
+        where.append(f"MATCH({cols}) AGAINST (%s IN BOOLEAN MODE)"); params.append(terms)
+    elif terms:
+        text = "CONCAT_WS(' ', " + ", ".join(f"{alias}.{c}" for c in SEARCH_COLUMNS[alias]) + ")"
+        for w in search_words(q):
+            where.append(f"{text} LIKE %s"); params.append(f"%{w}%")
+    selected = {"from": d_from.isoformat() if d_from else "",
+                "to": d_to.isoformat() if d_to else "",
+                "category_id": cat_id,
+                "q": q}
+    return where, params, selected
+
+def keyset_page(select_sql: str, alias: str, where: list, params: list, limit: int = None):
+    """One page of select_sql, newest first, positioned by the ?after= / ?before= cursor.
+
+    Returns (rows, next_cursor, prev_cursor); a cursor is None when there is no
+    page in that direction. Fetches limit+1 rows to learn whether more exist.
     """
+    limit = limit or PAGE_SIZE
+    after, before = parse_cursor(request.args.get("after")), parse_cursor(request.args.get("before"))
+    where, params = list(where), list(params)
+    if before:
+        d, i = before
+        where.append(f"{alias}.tx_date >= %s AND ({alias}.tx_date > %s OR {alias}.id > %s)")
+        params += [d, d, i]
+        order = "ASC"
+    else:
+        if after:
+            d, i = after
+            where.append(f"{alias}.tx_date <= %s AND ({alias}.tx_date < %s OR {alias}.id < %s)")
+            params += [d, d, i]
+        order = "DESC"
+
+    sql = select_sql
     if where: sql += " WHERE " + " AND ".join(where)
-    sql += " ORDER BY e.tx_date DESC, e.id DESC LIMIT 200;"
-
+    sql += f" ORDER BY {alias}.tx_date {order}, {alias}.id {order} LIMIT %s;"
     with get_conn().cursor() as cur:
-        cur.execute(sql, params)
+        cur.execute(sql, params + [limit + 1])
         rows = cur.fetchall()
 
-    return render_template("list_expenses.html",
-                           expenses=rows,
-                           categories=get_categories(),
-                           selected_from=d_from.isoformat() if d_from else "",
-                           selected_to=d_to.isoformat() if d_to else "",
-                           selected_cat=int(cat_id) if cat_id and cat_id.isdigit() else None)
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if before:
+        rows.reverse()
+    has_next = True if before else more
+    has_prev = more if before else after is not None
+    next_c = make_cursor(rows[-1]) if rows and has_next else None
+    prev_c = make_cursor(rows[0]) if rows and has_prev else None
+    return rows, next_c, prev_c
+
+def page_urls(endpoint: str, selected: dict, next_c, prev_c):
+    """next/prev links that keep the current filters."""
+    args = {k: v for k, v in selected.items() if v not in ("", None)}
+    return (url_for(endpoint, after=next_c, **args) if next_c else None,
+            url_for(endpoint, before=prev_c, **args) if prev_c else None)
+
+def json_rows(rows):
+    """DB rows -> JSON-friendly dicts (ISO dates, float amounts)."""
+    return [{**r, "tx_date": r["tx_date"].isoformat(), "amount": float(r["amount"])} for r in rows]
+
+# ---------- EXPENSES ----------
+EXPENSE_LIST_SQL = """
+    /* q:expense_list */ SELECT e.id, e.tx_date, c.name AS category, e.amount, e.payment_method, e.merchant, e.note
+    FROM expenses e
+    JOIN categories c ON c.id = e.category_id
+"""
+
+@app.route("/expenses")
+def list_expenses():
+    where, params, selected = list_filters("e")
+    rows, next_c, prev_c = keyset_page(EXPENSE_LIST_SQL, "e", where, params)
+    next_url, prev_url = page_urls("list_expenses", selected, next_c, prev_c)
+
+    return render_page("list_expenses.html", "_expense_table.html",
+                       expenses=rows,
+                       categories=[] if wants_fragment() else get_categories(),
+                       selected_from=selected["from"],
+                       selected_to=selected["to"],
+                       selected_cat=selected["category_id"],
+                       selected_q=selected["q"],
+                       budgets=budget_status(date.today().replace(day=1)),
+                       this_month=date.today().strftime("%Y-%m"),
+                       next_url=next_url,
+                       prev_url=prev_url)
+
+@app.route("/api/expenses")
+@cached_api
+def api_expenses():
+    where, params, _ = list_filters("e")
+    try:
+        limit = max(1, min(500, int(request.args.get("limit", PAGE_SIZE))))
+    except Exception:
+        limit = PAGE_SIZE
+    rows, next_c, prev_c = keyset_page(EXPENSE_LIST_SQL, "e", where, params, limit)
+    return jsonify({"items": json_rows(rows), "next": next_c, "prev": prev_c})
 
 @app.route("/add", methods=["GET", "POST"])
 def add_expense():
@@ -198,18 +1053,19 @@ def add_expense():
         for e in errors: flash(e, "error")
         return redirect(url_for("add_expense"))
 
-    with get_conn().cursor() as cur:
+    with transaction() as cur:
         cur.execute("""
             INSERT INTO expenses (tx_date, category_id, amount, payment_method, merchant, note)
             VALUES (%s,%s,%s,%s,%s,%s)
         """, (tx_date, int(category_id), amount_val, payment_method, merchant, note))
+        bump_daily_total(cur, "expense", tx_date, int(category_id), amount_val, 1)
     flash("Expense saved.", "ok")
     return redirect(url_for("dashboard"))
 
 @app.route("/expense/<int:id>/edit", methods=["GET","POST"])
 def edit_expense(id):
     with get_conn().cursor() as cur:
-        cur.execute("SELECT * FROM expenses WHERE id=%s", (id,))
+        cur.execute("/* q:expense_by_id */ SELECT * FROM expenses WHERE id=%s", (id,))
         row = cur.fetchone()
     if not row:
         flash(f"Expense #{id} not found.", "error")
@@ -240,58 +1096,73 @@ def edit_expense(id):
         for e in errors: flash(e, "error")
         return redirect(url_for("edit_expense", id=id))
 
-    with get_conn().cursor() as cur:
-        cur.execute("""
-            UPDATE expenses
-               SET tx_date=%s, category_id=%s, amount=%s, payment_method=%s, merchant=%s, note=%s
-             WHERE id=%s
-        """, (tx_date, int(category_id), amount_val, payment_method, merchant, note, id))
+    with transaction() as cur:
+        cur.execute("/* q:expense_lock */ SELECT tx_date, category_id, amount FROM expenses WHERE id=%s FOR UPDATE", (id,))
+        old = cur.fetchone()
+        if old:
+            cur.execute("""
+                UPDATE expenses
+                   SET tx_date=%s, category_id=%s, amount=%s, payment_method=%s, merchant=%s, note=%s
+                 WHERE id=%s
+            """, (tx_date, int(category_id), amount_val, payment_method, merchant, note, id))
+            bump_daily_total(cur, "expense", old["tx_date"], old["category_id"], -old["amount"], -1)
+            bump_daily_total(cur, "expense", tx_date, int(category_id), amount_val, 1)
+    if not old:
+        flash(f"Expense #{id} not found.", "error")
+        return redirect(url_for("list_expenses"))
     flash(f"Expense #{id} updated.", "ok")
     return redirect(url_for("list_expenses"))
 
 @app.route("/delete/<int:id>", methods=["POST"])
 def delete_expense(id):
-    with get_conn().cursor() as cur:
-        cur.execute("DELETE FROM expenses WHERE id=%s", (id,))
-        affected = cur.rowcount
+    with transaction() as cur:
+        cur.execute("/* q:expense_lock */ SELECT tx_date, category_id, amount FROM expenses WHERE id=%s FOR UPDATE", (id,))
+        old = cur.fetchone()
+        affected = 0
+        if old:
+            cur.execute("DELETE FROM expenses WHERE id=%s", (id,))
+            affected = cur.rowcount
+            record_tombstone(cur, "expense", id)
+            bump_daily_total(cur, "expense", old["tx_date"], old["category_id"], -old["amount"], -1)
     flash(f"{'Deleted' if affected else 'Not found'} expense #{id}.", "ok" if affected else "error")
     return redirect(url_for("list_expenses"))
 
 # ---------- INCOME ----------
+INCOME_LIST_SQL = """
+    /* q:income_list */ SELECT i.id, i.tx_date, ic.name AS category, i.amount, i.source, i.note
+    FROM incomes i
+    JOIN income_categories ic ON ic.id = i.category_id
+"""
+
 @app.route("/income")
 def list_income():
-    d_from = parse_ymd(request.args.get("from", "")) or None
-    d_to   = parse_ymd(request.args.get("to", "")) or None
-    cat_id = request.args.get("category_id")
-
-    where, params = [], []
-    if d_from: where.append("i.tx_date >= %s"); params.append(d_from)
-    if d_to:   where.append("i.tx_date <= %s"); params.append(d_to)
-    if cat_id and cat_id.isdigit():
-        where.append("i.category_id = %s"); params.append(int(cat_id))
-
-    sql = """
-        SELECT i.id, i.tx_date, ic.name AS category, i.amount, i.source, i.note
-        FROM incomes i
-        JOIN income_categories ic ON ic.id = i.category_id
-    """
-    if where: sql += " WHERE " + " AND ".join(where)
-    sql += " ORDER BY i.tx_date DESC, i.id DESC LIMIT 200;"
-
-    with get_conn().cursor() as cur:
-        cur.execute(sql, params)
-        rows = cur.fetchall()
-
-    return render_template("list_income.html",
-                           incomes=rows,
-                           categories=get_income_categories(),
-                           selected_from=d_from.isoformat() if d_from else "",
-                           selected_to=d_to.isoformat() if d_to else "",
-                           selected_cat=int(cat_id) if cat_id and cat_id.isdigit() else None)
+    where, params, selected = list_filters("i")
+    rows, next_c, prev_c = keyset_page(INCOME_LIST_SQL, "i", where, params)
+    next_url, prev_url = page_urls("list_income", selected, next_c, prev_c)
+
+    return render_page("list_income.html", "_income_table.html",
+                       incomes=rows,
+                       categories=[] if wants_fragment() else get_income_categories(),
+                       selected_from=selected["from"],
+                       selected_to=selected["to"],
+                       selected_cat=selected["category_id"],
+                       selected_q=selected["q"],
+                       next_url=next_url,
+                       prev_url=prev_url)
+
+@app.route("/api/income")
+@cached_api
+def api_income():
+    where, params, _ = list_filters("i")
+    try:
+        limit = max(1, min(500, int(request.args.get("limit", PAGE_SIZE))))
+    except Exception:
+        limit = PAGE_SIZE
+    rows, next_c, prev_c = keyset_page(INCOME_LIST_SQL, "i", where, params, limit)
+    return jsonify({"items": json_rows(rows), "next": next_c, "prev": prev_c})
 
 @app.route("/income/add", methods=["GET", "POST"])
 def add_income():
-    try_seed()
     if request.method == "GET":
         return render_template("add_income.html",
                                categories=get_income_categories(),
@@ -315,18 +1186,19 @@ def add_income():
         for e in errors: flash(e, "error")
         return redirect(url_for("add_income"))
 
-    with get_conn().cursor() as cur:
+    with transaction() as cur:
         cur.execute("""
             INSERT INTO incomes (tx_date, category_id, amount, source, note)
             VALUES (%s,%s,%s,%s,%s)
         """, (tx_date, int(category_id), amount_val, source, note))
+        bump_daily_total(cur, "income", tx_date, int(category_id), amount_val, 1)
     flash("Income saved.", "ok")
     return redirect(url_for("dashboard"))
 
 @app.route("/income/<int:id>/edit", methods=["GET","POST"])
 def edit_income(id):
     with get_conn().cursor() as cur:
-        cur.execute("SELECT * FROM incomes WHERE id=%s", (id,))
+        cur.execute("/* q:income_by_id */ SELECT * FROM incomes WHERE id=%s", (id,))
         row = cur.fetchone()
     if not row:
         flash(f"Income #{id} not found.", "error")
@@ -355,77 +1227,357 @@ def edit_income(id):
         for e in errors: flash(e, "error")
         return redirect(url_for("edit_income", id=id))
 
-    with get_conn().cursor() as cur:
-        cur.execute("""
-            UPDATE incomes
-               SET tx_date=%s, category_id=%s, amount=%s, source=%s, note=%s
-             WHERE id=%s
-        """, (tx_date, int(category_id), amount_val, source, note, id))
+    with transaction() as cur:
+        cur.execute("/* q:income_lock */ SELECT tx_date, category_id, amount FROM incomes WHERE id=%s FOR UPDATE", (id,))
+        old = cur.fetchone()
+        if old:
+            cur.execute("""
+                UPDATE incomes
+                   SET tx_date=%s, category_id=%s, amount=%s, source=%s, note=%s
+                 WHERE id=%s
+            """, (tx_date, int(category_id), amount_val, source, note, id))
+            bump_daily_total(cur, "income", old["tx_date"], old["category_id"], -old["amount"], -1)
+            bump_daily_total(cur, "income", tx_date, int(category_id), amount_val, 1)
+    if not old:
+        flash(f"Income #{id} not found.", "error")
+        return redirect(url_for("list_income"))
     flash(f"Income #{id} updated.", "ok")
     return redirect(url_for("list_income"))
 
 @app.route("/income/delete/<int:id>", methods=["POST"])
 def delete_income(id):
-    with get_conn().cursor() as cur:
-        cur.execute("DELETE FROM incomes WHERE id=%s", (id,))
-        affected = cur.rowcount
+    with transaction() as cur:
+        cur.execute("/* q:income_lock */ SELECT tx_date, category_id, amount FROM incomes WHERE id=%s FOR UPDATE", (id,))
+        old = cur.fetchone()
+        affected = 0
+        if old:
+            cur.execute("DELETE FROM incomes WHERE id=%s", (id,))
+            affected = cur.rowcount
+            record_tombstone(cur, "income", id)
+            bump_daily_total(cur, "income", old["tx_date"], old["category_id"], -old["amount"], -1)
     flash(f"{'Deleted' if affected else 'Not found'} income #{id}.", "ok" if affected else "error")
     return redirect(url_for("list_income"))
 
+# ---------- BUDGETS ----------
+# A monthly limit per expense category, checked against category_month_spend:
+# one counter row per (month, category) that the expense write routes adjust
+# in the same transaction as the expense itself. Reading budget status is
+# therefore a primary-key lookup per budgeted category, never a re-sum.
+BUDGET_WARN_PCT = float(os.getenv("MYWALLET_BUDGET_WARN_PCT", "80"))
+BUDGET_LIMIT_MAX = 1e12    # DECIMAL(14,2) holds up to 999,999,999,999.99
+
+def budget_status(month: date):
+    """[{category_id, category, limit, spent, remaining, pct, over, warn}] for budgeted categories."""
+    key = (data_version(), ("budget_status", month))
+    rows = api_cache.get(key)
+    if rows is None:
+        with get_conn().cursor() as cur:
+            cur.execute("""
+                /* q:budgets */ SELECT c.id AS category_id, c.name AS category, b.monthly_limit, COALESCE(s.spent, 0) AS spent
+                FROM budgets b
+                JOIN categories c ON c.id = b.category_id
+                LEFT JOIN category_month_spend s ON s.month = %s AND s.category_id = b.category_id
+                ORDER BY c.name
+            """, (month,))
+            rows = []
+            for r in cur.fetchall():
+                limit, spent = float(r["monthly_limit"]), float(r["spent"])
+                pct = round(spent / limit * 100, 1) if limit else 0.0
+                rows.append({"category_id": r["category_id"], "category": r["category"],
+                             "limit": limit, "spent": spent, "remaining": round(limit - spent, 2),
+                             "pct": pct, "over": spent > limit, "warn": pct >= BUDGET_WARN_PCT})
+        api_cache.put(key, rows)
+    return rows
+
+def reconcile_month_spend(since: date = None):
+    """Recompute category_month_spend from expenses (all months, or from since's month); returns rows fixed.
+
+    Archived years are left alone: their rows are no longer in expenses and
+    their counters cannot change any more.
+    """
+    start = month_of(since) if since else date(1, 1, 1)
+    start = max(start, archive_cutoff(fresh=True) or start)
+    with transaction() as cur:
+        # lock the counters first so concurrent expense writes wait for us
+        cur.execute("""
+            SELECT month, category_id, spent, tx_count FROM category_month_spend
+            WHERE month >= %s FOR UPDATE
+        """, (start,))
+        have = {(r["month"], r["category_id"]): (r["spent"], r["tx_count"]) for r in cur.fetchall()}
+        cur.execute("""
+            SELECT DATE_SUB(tx_date, INTERVAL (DAYOFMONTH(tx_date) - 1) DAY) AS month, category_id,
+                   SUM(amount) AS spent, COUNT(*) AS tx_count
+            FROM expenses WHERE tx_date >= %s
+            GROUP BY month, category_id
+        """, (start,))
+        want = {(r["month"], r["category_id"]): (r["spent"], r["tx_count"]) for r in cur.fetchall()}
+        wrong = [(m, c, spent, n) for (m, c), (spent, n) in want.items() if have.get((m, c)) != (spent, n)]
+        stale = [k for k in have if k not in want]
+        if wrong:
+            cur.executemany("""
+                INSERT INTO category_month_spend (month, category_id, spent, tx_count)
+                VALUES (%s,%s,%s,%s)
+                ON DUPLICATE KEY UPDATE spent = VALUES(spent), tx_count = VALUES(tx_count)
+            """, wrong)
+        if stale:
+            cur.executemany("DELETE FROM category_month_spend WHERE month=%s AND category_id=%s", stale)
+    return len(wrong) + len(stale)
+
+@app.cli.command("reconcile-budgets")
+@click.option("--since", help="Only months from this date (YYYY-MM-DD); default all.")
+def reconcile_budgets_cmd(since):
+    """Correct drift in the month-to-date spend counters."""
+    fixed = reconcile_month_spend(parse_ymd(since) if since else None)
+    print(f"category_month_spend: {fixed} row(s) corrected")
+
+@app.route("/api/budgets")
+@cached_api
+def api_budgets():
+    """?month=YYYY-MM (default current) -> budget status per budgeted category."""
+    month = request.args.get("month", "")
+    m_start = (parse_ymd(month + "-01") if len(month) == 7 else None) or date.today().replace(day=1)
+    return jsonify({"month": m_start.strftime("%Y-%m"), "budgets": budget_status(m_start)})
+
+@app.route("/budgets", methods=["GET", "POST"])
+def budgets():
+    if request.method == "POST":
+        limits, errors = {}, []
+        for c in get_categories():
+            raw = request.form.get(f"limit_{c['id']}", "").strip()
+            if not raw:
+                limits[c["id"]] = None
+                continue
+            try:
+                limits[c["id"]] = round(float(raw), 2)
+                if not math.isfinite(limits[c["id"]]) or not 0 < limits[c["id"]] < BUDGET_LIMIT_MAX:
+                    errors.append(f"{c['name']}: limit must be > 0 and < {BUDGET_LIMIT_MAX:,.0f}.")
+            except ValueError:
+                errors.append(f"{c['name']}: limit must be a number.")
+        if errors:
+            for e in errors: flash(e, "error")
+            return redirect(url_for("budgets"))
+        with transaction() as cur:
+            keep = [(cid, v) for cid, v in limits.items() if v is not None]
+            drop = [(cid,) for cid, v in limits.items() if v is None]
+            if keep:
+                cur.executemany("""
+                    INSERT INTO budgets (category_id, monthly_limit) VALUES (%s,%s)
+                    ON DUPLICATE KEY UPDATE monthly_limit = VALUES(monthly_limit)
+                """, keep)
+            if drop:
+                cur.executemany("DELETE FROM budgets WHERE category_id=%s", drop)
+        flash("Budgets saved.", "ok")
+        return redirect(url_for("budgets"))
+
+    month = date.today().replace(day=1)
+    status = {b["category_id"]: b for b in budget_status(month)}
+    return render_template("budgets.html",
+                           categories=get_categories(),
+                           status=status,
+                           month_label=month.strftime("%B %Y"))
+
+# ---------- TIME SERIES ----------
+# Income/expense over any from..to range. Bucketing happens in SQL on
+# daily_totals, so cost and payload grow with the number of buckets, not days.
+# bucket=auto picks the finest bucket that fits in SERIES_MAX_POINTS; a series
+# still longer than ?points= is thinned with LTTB (largest-triangle-three-
+# buckets), which keeps the peaks and dips that plain striding would drop.
+SERIES_MAX_POINTS = int(os.getenv("MYWALLET_SERIES_MAX_POINTS", "400"))
+SERIES_MAX_BUCKETS = int(os.getenv("MYWALLET_SERIES_MAX_BUCKETS", "5000"))   # zero-filled before LTTB
+SERIES_MIN_DATE, SERIES_MAX_DATE = date(1900, 1, 1), date(2999, 12, 31)
+SERIES_BUCKETS = {
+    "day":     "tx_date",
+    "week":    "DATE_SUB(tx_date, INTERVAL WEEKDAY(tx_date) DAY)",
+    "month":   "DATE_SUB(tx_date, INTERVAL (DAYOFMONTH(tx_date) - 1) DAY)",
+    "quarter": "MAKEDATE(YEAR(tx_date), 1) + INTERVAL (QUARTER(tx_date) - 1) QUARTER",
+}
+SERIES_SQL = """
+    /* q:series_{bucket} */ SELECT {expr} AS bucket,
+           SUM(CASE WHEN kind = 'income'  THEN total ELSE 0 END) AS income,
+           SUM(CASE WHEN kind = 'expense' THEN total ELSE 0 END) AS expense
+    FROM daily_totals
+    WHERE kind IN ('expense','income') AND tx_date >= %s AND tx_date <= %s
+    GROUP BY bucket
+    ORDER BY bucket
+"""
+
+def bucket_start(d: date, bucket: str):
+    """First day of the bucket containing d (weeks start on Monday, like WEEKDAY())."""
+    if bucket == "week":
+        return d - timedelta(days=d.weekday())
+    if bucket == "month":
+        return d.replace(day=1)
+    if bucket == "quarter":
+        return date(d.year, (d.month - 1) // 3 * 3 + 1, 1)
+    return d
+
+def next_bucket(d: date, bucket: str):
+    if bucket == "day":
+        return d + timedelta(days=1)
+    if bucket == "week":
+        return d + timedelta(days=7)
+    return add_months(d, 3 if bucket == "quarter" else 1)
+
+def bucket_label(d: date, bucket: str):
+    if bucket == "month":
+        return d.strftime("%Y-%m")
+    if bucket == "quarter":
+        return f"{d.year}-Q{(d.month - 1) // 3 + 1}"
+    return d.isoformat()
+
+def bucket_count(d_from: date, d_to: date, bucket: str):
+    days = (d_to - d_from).days + 1
+    months = (d_to.year - d_from.year) * 12 + d_to.month - d_from.month + 1
+    return {"day": days, "week": days // 7 + 2, "month": months, "quarter": months // 3 + 2}[bucket]
+
+def pick_bucket(d_from: date, d_to: date, max_points: int):
+    for bucket in ("day", "week", "month"):
+        if bucket_count(d_from, d_to, bucket) <= max_points:
+            return bucket
+    return "quarter"
+
+def lttb(ys, threshold: int):
+    """Indices of `threshold` points that keep the shape of every series in ys.
+
+    ys is a list of equally long series sharing one evenly spaced x axis; the
+    triangle areas of all series are summed so one index set serves them all.
+    """
+    n = len(ys[0]) if ys else 0
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    keep, a = [0], 0
+    for i in range(threshold - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        nlo, nhi = hi, min(int((i + 2) * every) + 1, n)
+        cx = (nlo + nhi - 1) / 2
+        cys = [sum(y[nlo:nhi]) / (nhi - nlo) for y in ys]
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = sum(abs((a - cx) * (y[j] - y[a]) - (a - j) * (cy - y[a])) for y, cy in zip(ys, cys))
+            if area > best_area:
+                best, best_area = j, area
+        keep.append(best)
+        a = best
+    keep.append(n - 1)
+    return keep
+
+def series_between(d_from: date, d_to: date, bucket: str = "auto", points: int = SERIES_MAX_POINTS):
+    """Zero-filled income/expense/net per bucket over d_from..d_to (inclusive).
+
+    An explicit bucket that would need more than SERIES_MAX_BUCKETS buckets
+    is replaced by the auto choice.
+    """
+    if bucket not in SERIES_BUCKETS or bucket_count(d_from, d_to, bucket) > SERIES_MAX_BUCKETS:
+        bucket = pick_bucket(d_from, d_to, points)
+    with get_conn().cursor() as cur:
+        cur.execute(SERIES_SQL.format(bucket=bucket, expr=SERIES_BUCKETS[bucket]), (d_from, d_to))
+        found = {r["bucket"]: r for r in cur.fetchall()}
+
+    labels, income, expense = [], [], []
+    b, last = bucket_start(d_from, bucket), bucket_start(d_to, bucket)
+    while True:
+        r = found.get(b)
+        labels.append(bucket_label(b, bucket))
+        income.append(round(float(r["income"]), 2) if r else 0.0)
+        expense.append(round(float(r["expense"]), 2) if r else 0.0)
+        if b >= last:
+            break       # never step past d_to's bucket, which may be the last representable one
+        b = next_bucket(b, bucket)
+
+    keep = lttb([income, expense], points)
+    downsampled = len(keep) < len(labels)
+    if downsampled:
+        labels = [labels[i] for i in keep]
+        income = [income[i] for i in keep]
+        expense = [expense[i] for i in keep]
+    return {
+        "from": d_from.isoformat(), "to": d_to.isoformat(),
+        "bucket": bucket, "downsampled": downsampled,
+        "labels": labels, "income": income, "expense": expense,
+        "net": [round(i - e, 2) for i, e in zip(income, expense)],
+    }
+
+@app.route("/api/series")
+@cached_api
+def api_series():
+    """?from=&to=&bucket=auto|day|week|month|quarter&points=N (default: the last 12 months)."""
+    d_to = parse_ymd(request.args.get("to", "")) or date.today()
+    if not SERIES_MIN_DATE <= d_to <= SERIES_MAX_DATE:
+        return jsonify({"error": f"to must be between {SERIES_MIN_DATE} and {SERIES_MAX_DATE}"}), 400
+    d_from = parse_ymd(request.args.get("from", "")) or max(SERIES_MIN_DATE, add_months(d_to, -11))
+    if not SERIES_MIN_DATE <= d_from <= SERIES_MAX_DATE:
+        return jsonify({"error": f"from must be between {SERIES_MIN_DATE} and {SERIES_MAX_DATE}"}), 400
+    if d_from > d_to:
+        d_from, d_to = d_to, d_from
+    points = int_arg("points", SERIES_MAX_POINTS, 3, SERIES_MAX_POINTS)
+    return jsonify(series_between(d_from, d_to, request.args.get("bucket", "auto"), points))
+
 # ---------- Analytics JSON ----------
 @app.route("/api/summary")
+@cached_api
 def api_summary():
     d_from, d_to = default_range()
     return jsonify(totals_between(d_from, d_to))
 
 @app.route("/api/expense_by_category")
+@cached_api
 def api_expense_by_category():
     month = request.args.get("month")
     with get_conn().cursor() as cur:
         if month and len(month) == 7:
             cur.execute("""
-                SELECT c.name AS label, COALESCE(SUM(e.amount),0) AS value
-                FROM expenses e
-                JOIN categories c ON c.id = e.category_id
-                WHERE e.tx_date >= CONCAT(%s, '-01')
-                  AND e.tx_date <  DATE_FORMAT(DATE_ADD(CONCAT(%s,'-01'), INTERVAL 1 MONTH), '%%Y-%%m-%%d')
+                /* q:expense_by_category */ SELECT c.name AS label, COALESCE(SUM(d.total),0) AS value
+                FROM daily_totals d
+                JOIN categories c ON c.id = d.category_id
+                WHERE d.kind = 'expense'
+                  AND d.tx_date >= CONCAT(%s, '-01')
+                  AND d.tx_date <  DATE_FORMAT(DATE_ADD(CONCAT(%s,'-01'), INTERVAL 1 MONTH), '%%Y-%%m-%%d')
+                  AND d.tx_count > 0
                 GROUP BY c.name ORDER BY value DESC;
             """, (month, month))
         else:
             cur.execute("""
-                SELECT c.name AS label, COALESCE(SUM(e.amount),0) AS value
-                FROM expenses e
-                JOIN categories c ON c.id = e.category_id
-                WHERE e.tx_date >= DATE_FORMAT(CURDATE(), '%%Y-%%m-01')
-                  AND e.tx_date <  DATE_FORMAT(DATE_ADD(CURDATE(), INTERVAL 1 MONTH), '%%Y-%%m-01')
+                /* q:expense_by_category */ SELECT c.name AS label, COALESCE(SUM(d.total),0) AS value
+                FROM daily_totals d
+                JOIN categories c ON c.id = d.category_id
+                WHERE d.kind = 'expense'
+                  AND d.tx_date >= DATE_FORMAT(CURDATE(), '%%Y-%%m-01')
+                  AND d.tx_date <  DATE_FORMAT(DATE_ADD(CURDATE(), INTERVAL 1 MONTH), '%%Y-%%m-01')
+                  AND d.tx_count > 0
                 GROUP BY c.name ORDER BY value DESC;
             """)
         rows = cur.fetchall()
     return jsonify(rows)
 
 @app.route("/api/income_by_category")
+@cached_api
 def api_income_by_category():
     month = request.args.get("month")
     with get_conn().cursor() as cur:
         if month and len(month) == 7:
             # e.g. 2025-08
             cur.execute("""
-                SELECT ic.name AS label, COALESCE(SUM(i.amount),0) AS value
-                FROM incomes i
-                JOIN income_categories ic ON ic.id = i.category_id
-                WHERE i.tx_date >= CONCAT(%s, '-01')
-                  AND i.tx_date <  DATE_FORMAT(DATE_ADD(CONCAT(%s,'-01'), INTERVAL 1 MONTH), '%%Y-%%m-%%d')
+                /* q:income_by_category */ SELECT ic.name AS label, COALESCE(SUM(d.total),0) AS value
+                FROM daily_totals d
+                JOIN income_categories ic ON ic.id = d.category_id
+                WHERE d.kind = 'income'
+                  AND d.tx_date >= CONCAT(%s, '-01')
+                  AND d.tx_date <  DATE_FORMAT(DATE_ADD(CONCAT(%s,'-01'), INTERVAL 1 MONTH), '%%Y-%%m-%%d')
+                  AND d.tx_count > 0
                 GROUP BY ic.name
                 ORDER BY value DESC;
             """, (month, month))
         else:
             # current month
             cur.execute("""
-                SELECT ic.name AS label, COALESCE(SUM(i.amount),0) AS value
-                FROM incomes i
-                JOIN income_categories ic ON ic.id = i.category_id
-                WHERE i.tx_date >= DATE_FORMAT(CURDATE(), '%%Y-%%m-01')
-                  AND i.tx_date <  DATE_FORMAT(DATE_ADD(CURDATE(), INTERVAL 1 MONTH), '%%Y-%%m-01')
+                /* q:income_by_category */ SELECT ic.name AS label, COALESCE(SUM(d.total),0) AS value
+                FROM daily_totals d
+                JOIN income_categories ic ON ic.id = d.category_id
+                WHERE d.kind = 'income'
+                  AND d.tx_date >= DATE_FORMAT(CURDATE(), '%%Y-%%m-01')
+                  AND d.tx_date <  DATE_FORMAT(DATE_ADD(CURDATE(), INTERVAL 1 MONTH), '%%Y-%%m-01')
+                  AND d.tx_count > 0
                 GROUP BY ic.name
                 ORDER BY value DESC;
             """)
@@ -433,124 +1585,1107 @@ def api_income_by_category():
     return jsonify(rows)
 
 @app.route("/api/cashflow_daily")
+@cached_api
 def api_cashflow_daily():
-    try:
-        days = max(1, min(90, int(request.args.get("days", "30"))))
-    except Exception:
-        days = 30
-    start = date.today() - timedelta(days=days-1)
-    with get_conn().cursor() as cur:
-        cur.execute("SELECT tx_date, SUM(amount) AS total FROM expenses WHERE tx_date >= %s GROUP BY tx_date", (start,))
-        exp_map = {str(r["tx_date"]): float(r["total"]) for r in cur.fetchall()}
-        cur.execute("SELECT tx_date, SUM(amount) AS total FROM incomes WHERE tx_date >= %s GROUP BY tx_date", (start,))
-        inc_map = {str(r["tx_date"]): float(r["total"]) for r in cur.fetchall()}
-    labels, inc, exp = [], [], []
-    for i in range(days):
-        d = str(start + timedelta(days=i))
-        labels.append(d)
-        inc.append(round(inc_map.get(d, 0.0), 2))
-        exp.append(round(exp_map.get(d, 0.0), 2))
-    return jsonify({"labels": labels, "income": inc, "expense": exp})
+    days = int_arg("days", 30, 1, 3660)
+    today = date.today()
+    return jsonify(series_between(today - timedelta(days=days-1), today, "day"))
 
 @app.route("/api/monthly_totals")
+@cached_api
 def api_monthly_totals():
-    try:
-        m = max(3, min(24, int(request.args.get("months", "12"))))
-    except Exception:
-        m = 12
-    with get_conn().cursor() as cur:
-        cur.execute("SELECT DATE_FORMAT(tx_date, '%%Y-%%m') AS ym, SUM(amount) AS total FROM expenses GROUP BY ym ORDER BY ym DESC LIMIT %s", (m,))
-        exp = {r["ym"]: float(r["total"]) for r in cur.fetchall()}
-        cur.execute("SELECT DATE_FORMAT(tx_date, '%%Y-%%m') AS ym, SUM(amount) AS total FROM incomes GROUP BY ym ORDER BY ym DESC LIMIT %s", (m,))
-        inc = {r["ym"]: float(r["total"]) for r in cur.fetchall()}
-    months = sorted(set(exp.keys()) | set(inc.keys()))
-    months = months[-m:]
+    m = int_arg("months", 12, 1, 1200)
+    today = date.today()
+    return jsonify(series_between(add_months(today, -(m - 1)), today, "month"))
+
+# ---- analytics bundle ----
+# Everything analytics.html draws, in one response from two queries run side by
+# side: the month's category split for both kinds, plus a single (kind, day) scan over
+# the widest window asked for, from which the summary, the daily cashflow and
+# the monthly totals are all folded in Python.
+ANALYTICS_CATEGORY_SQL = """
+    /* q:analytics_by_category */ SELECT d.kind, COALESCE(c.name, ic.name) AS label, SUM(d.total) AS value
+    FROM daily_totals d
+    LEFT JOIN categories c ON d.kind = 'expense' AND c.id = d.category_id
+    LEFT JOIN income_categories ic ON d.kind = 'income' AND ic.id = d.category_id
+    WHERE d.kind IN ('expense','income') AND d.tx_date >= %s AND d.tx_date < %s AND d.tx_count > 0
+    GROUP BY d.kind, label
+    HAVING label IS NOT NULL
+    ORDER BY d.kind, value DESC
+"""
+
+DAILY_SQL = """
+    /* q:daily_by_kind */ SELECT kind, tx_date, SUM(total) AS total
+    FROM daily_totals
+    WHERE kind IN ('expense','income') AND tx_date >= %s AND tx_date <= %s
+    GROUP BY kind, tx_date
+"""
+
+def by_kind_day(rows):
+    """DAILY_SQL rows -> {"expense": {date: total}, "income": {...}}"""
+    by_kind = {"expense": {}, "income": {}}
+    for r in rows:
+        by_kind[r["kind"]][r["tx_date"]] = float(r["total"])
+    return by_kind
+
+def daily_series(by_kind, start: date, days: int):
+    """One point per day from start, zero-filled."""
+    labels, inc, exp = [], [], []
+    for i in range(days):
+        d = start + timedelta(days=i)
+        labels.append(str(d))
+        inc.append(round(by_kind["income"].get(d, 0.0), 2))
+        exp.append(round(by_kind["expense"].get(d, 0.0), 2))
+    return {"labels": labels, "income": inc, "expense": exp}
+
+def monthly_series(by_kind, first: date, months: int):
+    """One point per calendar month from first, zero-filled, with net."""
+    sums = {"expense": {}, "income": {}}
+    for kind, days in by_kind.items():
+        for d, v in days.items():
+            ym = d.strftime("%Y-%m")
+            sums[kind][ym] = sums[kind].get(ym, 0.0) + v
     labels, income, expense, net = [], [], [], []
-    for ym in months:
-        i = round(inc.get(ym, 0.0), 2)
-        e = round(exp.get(ym, 0.0), 2)
+    for i in range(months):
+        ym = add_months(first, i).strftime("%Y-%m")
+        inc = round(sums["income"].get(ym, 0.0), 2)
+        exp = round(sums["expense"].get(ym, 0.0), 2)
         labels.append(ym)
-        income.append(i)
-        expense.append(e)
-        net.append(round(i - e, 2))
-    return jsonify({"labels": labels, "income": income, "expense": expense, "net": net})
+        income.append(inc)
+        expense.append(exp)
+        net.append(round(inc - exp, 2))
+    return {"labels": labels, "income": income, "expense": expense, "net": net}
+
+@app.route("/api/analytics")
+@cached_api
+def api_analytics():
+    """?month=YYYY-MM&days=N&months=M -> summary, by_category, cashflow and monthly in one payload."""
+    today = date.today()
+    month = request.args.get("month", "")
+    m_start = (parse_ymd(month + "-01") if len(month) == 7 else None) or today.replace(day=1)
+    days = int_arg("days", 30, 1, 90)
+    months = int_arg("months", 12, 3, 24)
+    flow_start = today - timedelta(days=days-1)
+    months_start = add_months(today, -(months - 1))
+    s_from, s_to = default_range()
+
+    found = parallel_queries({
+        "days": (DAILY_SQL, (min(flow_start, months_start), today)),        # the heavier one runs here
+        "categories": (ANALYTICS_CATEGORY_SQL, (m_start, add_months(m_start, 1))),
+    })
+    by_kind = by_kind_day(found["days"])
+    by_category = {"expense": [], "income": []}
+    for r in found["categories"]:
+        by_category[r["kind"]].append({"label": r["label"], "value": float(r["value"])})
+    totals = [{"kind": k, "total": sum(v for d, v in m.items() if s_from <= d <= s_to)}
+              for k, m in by_kind.items()]
+    return jsonify({
+        "month": m_start.strftime("%Y-%m"),
+        "summary": summarize_totals(s_from, s_to, totals),
+        "by_category": by_category,
+        "cashflow": daily_series(by_kind, flow_start, days),
+        "monthly": monthly_series(by_kind, months_start, months),
+    })
 
 # ---------- CSV EXPORT ----------
-def _csv_response(filename: str, headers: list[str], rows: list[dict]):
-    buff = io.StringIO()
-    w = csv.writer(buff)
-    w.writerow(headers)
-    for r in rows:
-        w.writerow([r.get(k) for k in headers])
-    data = buff.getvalue().encode("utf-8-sig")  # BOM for Excel
+CSV_CHUNK_ROWS = 1000   # rows per fetchmany() / per yielded chunk
+
+def _stream_rows(sql: str, params: list, batch_rows: int):
+    """Yield fetchmany() batches of row tuples from an unbuffered SSCursor.
+
+    Runs on a dedicated pooled connection, so memory stays flat however many
+    rows match. If the consumer stops early (client went away) the connection
+    is dropped rather than drained.
+    """
+    conn = pool.acquire()
+    cur, finished, fetched = conn.cursor(CountingSSCursor), False, 0
+    try:
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(batch_rows)
+            if not rows:
+                break
+            fetched += len(rows)
+            yield rows
+        finished = True
+    finally:
+        metrics.add_query_rows(query_name(sql), fetched)
+        if finished:
+            cur.close()
+            pool.release(conn)
+        else:
+            pool.release(conn, broken=True)
+
+def _stream_statements(statements: list, batch_rows: int):
+    """_stream_rows() over several (sql, params) in turn, one connection at a time."""
+    for sql, params in statements:
+        with closing(_stream_rows(sql, params, batch_rows)) as batches:
+            yield from batches
+
+def _stream_started(statements: list, batch_rows: int):
+    """_stream_statements() with its first batch already fetched.
+
+    Call it in the view, before building the Response: a pool timeout or a
+    failing first query then becomes the usual 503/500 instead of a 200 whose
+    body stops after the header.
+    """
+    batches = _stream_statements(statements, batch_rows)
+    first = next(batches, None)
+
+    def resumed():
+        try:
+            if first is not None:
+                yield first
+                yield from batches
+        finally:
+            batches.close()
+    return resumed()
+
+def _csv_stream(filename: str, headers: list[str], statements: list):
+    """Stream (sql, params) queries out as one CSV without holding the result in memory.
+
+    The rows go out in CSV_CHUNK_ROWS-sized chunks, so the download starts as
+    soon as the first rows arrive. Each SELECT list must be in the same order
+    as ``headers``.
+    """
+    def generate(batches):
+        buff = io.StringIO()
+        w = csv.writer(buff)
+        w.writerow(headers)
+        yield buff.getvalue().encode("utf-8-sig")  # BOM for Excel
+        buff.seek(0); buff.truncate()
+
+        with closing(batches):
+            for rows in batches:
+                w.writerows(rows)
+                yield buff.getvalue().encode("utf-8")
+                buff.seek(0); buff.truncate()
+
     return Response(
-        data,
-        mimetype="text/csv; charset=utf-8",
+        generate(_stream_started(statements, CSV_CHUNK_ROWS)),
+        content_type="text/csv; charset=utf-8",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
-@app.route("/export/expenses.csv")
-def export_expenses_csv():
-    d_from = parse_ymd(request.args.get("from", "")) or None
-    d_to   = parse_ymd(request.args.get("to", "")) or None
-    cat_id = request.args.get("category_id")
+EXPORTS = {   # kind -> (table alias, file prefix, SELECT in header order; {table} is live or archive)
+    "expense": ("e", "expenses", """
+        /* q:{tag} */ SELECT e.id AS id, e.tx_date AS date, c.name AS category, e.amount AS amount,
+               e.payment_method AS method, e.merchant AS merchant, e.note AS note
+        FROM {table} e JOIN categories c ON c.id = e.category_id
+    """),
+    "income": ("i", "income", """
+        /* q:{tag} */ SELECT i.id AS id, i.tx_date AS date, ic.name AS category, i.amount AS amount,
+               i.source AS source, i.note AS note
+        FROM {table} i JOIN income_categories ic ON ic.id = i.category_id
+    """),
+}
+EXPORT_HEADERS = {
+    "expense": ["id", "date", "category", "amount", "method", "merchant", "note"],
+    "income":  ["id", "date", "category", "amount", "source", "note"],
+}
 
-    where, params = [], []
-    if d_from: where.append("e.tx_date >= %s"); params.append(d_from)
-    if d_to:   where.append("e.tx_date <= %s"); params.append(d_to)
-    if cat_id and cat_id.isdigit():
-        where.append("e.category_id = %s"); params.append(int(cat_id))
+def export_query(kind: str):
+    """list_filters() applied to the kind's export SELECT -> ([(sql, params)], filename stem), oldest first.
 
-    sql = """
-        SELECT e.id AS id, e.tx_date AS date, c.name AS category, e.amount AS amount,
-               e.payment_method AS method, e.merchant AS merchant, e.note AS note
-        FROM expenses e JOIN categories c ON c.id = e.category_id
+    A range that starts before this year also reads the archive (only closed
+    years are ever archived), ahead of the live rows.
     """
+    alias, prefix, template = EXPORTS[kind]
+    live, archive, _ = ARCHIVE_TABLES[kind]
+    where, params, selected = list_filters(alias)
+    statements = []
+    d_from = parse_ymd(selected["from"])
+    if not d_from or d_from.year < date.today().year:
+        a_where, a_params, _ = list_filters(alias, fulltext=False)
+        sql = template.format(tag=f"export_{prefix}_archived", table=archive)
+        if a_where: sql += " WHERE " + " AND ".join(a_where)
+        statements.append((sql + f" ORDER BY {alias}.tx_date, {alias}.id;", a_params))
+    sql = template.format(tag=f"export_{prefix}", table=live)
     if where: sql += " WHERE " + " AND ".join(where)
-    sql += " ORDER BY e.tx_date, e.id;"
+    statements.append((sql + f" ORDER BY {alias}.tx_date, {alias}.id;", params))
+    return statements, f'{prefix}_{selected["from"]}_{selected["to"]}'
 
-    with get_conn().cursor() as cur:
-        cur.execute(sql, params)
-        rows = cur.fetchall()
-
-    fname = f'expenses_{(d_from or "")}_{(d_to or "")}.csv'.replace(":", "-")
-    return _csv_response(fname, ["id","date","category","amount","method","merchant","note"], rows)
+@app.route("/export/expenses.csv")
+def export_expenses_csv():
+    statements, stem = export_query("expense")
+    return _csv_stream(f"{stem}.csv", EXPORT_HEADERS["expense"], statements)
 
 @app.route("/export/income.csv")
 def export_income_csv():
-    d_from = parse_ymd(request.args.get("from", "")) or None
-    d_to   = parse_ymd(request.args.get("to", "")) or None
-    cat_id = request.args.get("category_id")
+    statements, stem = export_query("income")
+    return _csv_stream(f"{stem}.csv", EXPORT_HEADERS["income"], statements)
+
+# ---------- COLUMNAR EXPORT ----------
+# The same exports as typed Arrow IPC (.arrow, the random-access file format
+# that pandas/polars/DuckDB can memory-map) or Parquet. pyarrow is optional:
+# it is imported on first use and these routes answer 501 without it. Rows
+# are read COLUMNAR_BATCH_ROWS at a time from a streaming cursor; each batch
+# becomes one Arrow record batch / Parquet row group and is sent as soon as
+# it is written.
+COLUMNAR_BATCH_ROWS = int(os.getenv("MYWALLET_COLUMNAR_BATCH_ROWS", "50000"))
+COLUMNAR_TYPES = {"arrow": "application/vnd.apache.arrow.file", "parquet": "application/vnd.apache.parquet"}
+
+def _load_pyarrow():
+    try:
+        import pyarrow, pyarrow.ipc, pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+def export_schema(pa, kind: str):
+    text = pa.string()
+    fields = [("id", pa.int32()), ("date", pa.date32()), ("category", text), ("amount", pa.decimal128(12, 2))]
+    if kind == "expense":
+        fields += [("method", text), ("merchant", text), ("note", text)]
+    else:
+        fields += [("source", text), ("note", text)]
+    return pa.schema(fields)
+
+class _DrainSink:
+    """Write-only file object for the pyarrow writers; written bytes are collected until drained."""
+    def __init__(self):
+        self.chunks, self.pos, self.closed = [], 0, False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out = b"".join(self.chunks)
+        self.chunks.clear()
+        return out
+
+def _columnar_stream(pa, fmt: str, filename: str, schema, statements: list):
+    def generate(batches):
+        sink = _DrainSink()
+        out = pa.PythonFile(sink, mode="w")
+        if fmt == "parquet":
+            writer = pa.parquet.ParquetWriter(out, schema, compression="snappy")
+            write = lambda batch: writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            writer = pa.ipc.new_file(out, schema)
+            write = writer.write_batch
+        with closing(batches):
+            for rows in batches:
+                columns = list(zip(*rows))
+                write(pa.record_batch([pa.array(col, type=f.type) for col, f in zip(columns, schema)], schema=schema))
+                yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    return Response(generate(_stream_started(statements, COLUMNAR_BATCH_ROWS)), content_type=COLUMNAR_TYPES[fmt],
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.route("/export/expenses.<any(arrow, parquet):fmt>", endpoint="export_expenses_columnar")
+@app.route("/export/income.<any(arrow, parquet):fmt>", endpoint="export_income_columnar")
+def export_columnar(fmt):
+    kind = "expense" if request.endpoint == "export_expenses_columnar" else "income"
+    pa = _load_pyarrow()
+    if pa is None:
+        return jsonify({"error": "Arrow/Parquet export needs pyarrow: pip install pyarrow"}), 501
+    statements, stem = export_query(kind)
+    return _columnar_stream(pa, fmt, f"{stem}.{fmt}", export_schema(pa, kind), statements)
+
+# ---------- CHANGE FEED ----------
+# Rows inserted, updated or deleted since a watermark, for incremental BI
+# refresh. Inserts/updates come from updated_at (migrations/0006), deletes
+# from the deleted_rows tombstones. The three sources are merged in
+# (changed_at, source, seq) order; every row carries its own `cursor`, and the
+# last cursor a client saw is its next ?since=. Rows younger than
+# CHANGES_SETTLE_SECONDS are held back: a transaction stamps updated_at when
+# it writes but becomes visible when it commits, and the lag keeps a slow
+# commit from landing behind a watermark a reader has already passed.
+CHANGES_PAGE_SIZE = int(os.getenv("MYWALLET_CHANGES_PAGE_SIZE", "1000"))
+CHANGES_SETTLE_SECONDS = int(os.getenv("MYWALLET_CHANGES_SETTLE_SECONDS", "5"))
+CHANGE_COLUMNS = ["cursor", "kind", "op", "id", "changed_at", "tx_date", "category",
+                  "amount", "method", "merchant", "source", "note"]
+CHANGE_SOURCES = [   # (source rank, timestamp column, keyset id column, SELECT ... FROM)
+    (1, "e.updated_at", "e.id", """
+        SELECT 'expense' AS kind, 'upsert' AS op, e.id, e.updated_at AS changed_at, 1 AS src, e.id AS seq,
+               e.tx_date, c.name AS category, e.amount, e.payment_method AS method, e.merchant, NULL AS source, e.note
+        FROM expenses e JOIN categories c ON c.id = e.category_id"""),
+    (2, "i.updated_at", "i.id", """
+        SELECT 'income', 'upsert', i.id, i.updated_at, 2, i.id,
+               i.tx_date, ic.name, i.amount, NULL, NULL, i.source, i.note
+        FROM incomes i JOIN income_categories ic ON ic.id = i.category_id"""),
+    (3, "d.deleted_at", "d.id", """
+        SELECT d.kind, 'delete', d.row_id, d.deleted_at, 3, d.id,
+               NULL, NULL, NULL, NULL, NULL, NULL, NULL
+        FROM deleted_rows d"""),
+]
+
+def record_tombstone(cur, kind: str, row_id: int):
+    cur.execute("INSERT INTO deleted_rows (kind, row_id) VALUES (%s,%s)", (kind, row_id))
+
+def parse_watermark(s: str):
+    """'<ISO timestamp>_<source>_<seq>' cursor, or a bare date/timestamp -> (ts, source, seq); None = from the start."""
+    parts = (s or "").strip().split("_")
+    try:
+        ts = datetime.fromisoformat(parts[0])
+        if len(parts) == 3:
+            return ts, int(parts[1]), int(parts[2])
+        return (ts, 0, 0) if len(parts) == 1 else None     # bare timestamp: everything at or after it
+    except ValueError:
+        return None
 
-    where, params = [], []
-    if d_from: where.append("i.tx_date >= %s"); params.append(d_from)
-    if d_to:   where.append("i.tx_date <= %s"); params.append(d_to)
-    if cat_id and cat_id.isdigit():
-        where.append("i.category_id = %s"); params.append(int(cat_id))
+def changes_sql(since, limit: int = None):
+    """(sql, params) for the merged change feed after `since`, oldest first."""
+    branches, params = [], []
+    for rank, ts, key, select in CHANGE_SOURCES:
+        where = [f"{ts} < NOW(6) - INTERVAL %s SECOND"]
+        params.append(CHANGES_SETTLE_SECONDS)
+        if since:
+            t, r, i = since
+            if rank > r:
+                where.append(f"{ts} >= %s"); params.append(t)
+            elif rank == r:
+                where.append(f"({ts} > %s OR ({ts} = %s AND {key} > %s))"); params += [t, t, i]
+            else:
+                where.append(f"{ts} > %s"); params.append(t)
+        branch = f"({select.strip()}\n        WHERE {' AND '.join(where)} ORDER BY {ts}, {key}"
+        if limit:
+            branch += " LIMIT %s"; params.append(limit + 1)
+        branches.append(branch + ")")
+    sql = f"""
+        /* q:changes */ SELECT CONCAT(DATE_FORMAT(ch.changed_at, '%%Y-%%m-%%dT%%H:%%i:%%s.%%f'), '_', ch.src, '_', ch.seq) AS `cursor`,
+               ch.kind, ch.op, ch.id, ch.changed_at, ch.tx_date, ch.category, ch.amount, ch.method, ch.merchant, ch.source, ch.note
+        FROM ({" UNION ALL ".join(branches)}) ch
+        ORDER BY ch.changed_at, ch.src, ch.seq"""
+    if limit:
+        sql += " LIMIT %s"; params.append(limit + 1)
+    return sql, params
+
+@app.route("/api/changes")
+def api_changes():
+    """?since=<cursor>&limit=N -> {items, next, more}; pass `next` back as ?since= until more is false."""
+    since_arg = request.args.get("since", "")
+    since = parse_watermark(since_arg)
+    if since_arg and not since:
+        return jsonify({"error": "since must be a cursor from a previous response or an ISO date/timestamp"}), 400
+    limit = int_arg("limit", CHANGES_PAGE_SIZE, 1, 10000)
+    sql, params = changes_sql(since, limit)
+    with get_conn().cursor() as cur:
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    items = [{**r, "changed_at": r["changed_at"].isoformat(),
+              "tx_date": r["tx_date"].isoformat() if r["tx_date"] else None,
+              "amount": float(r["amount"]) if r["amount"] is not None else None} for r in rows]
+    return jsonify({"items": items, "next": rows[-1]["cursor"] if rows else since_arg or None, "more": more})
+
+@app.route("/api/changes.csv")
+def api_changes_csv():
+    """Every change after ?since= as one streamed CSV; the last row's cursor is the next ?since=."""
+    since_arg = request.args.get("since", "")
+    since = parse_watermark(since_arg)
+    if since_arg and not since:
+        return jsonify({"error": "since must be a cursor from a previous response or an ISO date/timestamp"}), 400
+    sql, params = changes_sql(since)
+    return _csv_stream("changes.csv", CHANGE_COLUMNS, [(sql, params)])
+
+# ---------- ARCHIVE ----------
+# `flask archive` moves closed years out of expenses/incomes into the
+# year-partitioned *_archive tables (migrations/0008) and sums them into
+# archive_totals by month and year. daily_totals and the budget counters
+# keep every year, and every chart and total reads daily_totals, so they are
+# unchanged and still count rows written into an archived year later. The
+# list pages, search and the change feed see live rows only; exports read
+# both. archive_totals backs /api/archive/totals, the report over the
+# archive itself.
+ARCHIVE_TABLES = {   # kind -> (live table, archive table, columns moved)
+    "expense": ("expenses", "expenses_archive",
+                ["id", "tx_date", "category_id", "amount", "payment_method", "merchant", "note", "client_key"]),
+    "income": ("incomes", "incomes_archive",
+               ["id", "tx_date", "category_id", "amount", "source", "note", "client_key"]),
+}
+ARCHIVE_KEEP_YEARS = int(os.getenv("MYWALLET_ARCHIVE_KEEP_YEARS", "2"))   # live calendar years, counting this one
+_archive_cutoff = [0.0, None]     # [expires_at, 1 Jan after the last archived year]
 
-    sql = """
-        SELECT i.id AS id, i.tx_date AS date, ic.name AS category, i.amount AS amount,
-               i.source AS source, i.note AS note
-        FROM incomes i JOIN income_categories ic ON ic.id = i.category_id
+def archive_cutoff(fresh: bool = False):
+    """First day after the archived years, or None; cached like the categories unless fresh."""
+    if not fresh and _archive_cutoff[0] > time.monotonic():
+        return _archive_cutoff[1]
+    with get_conn().cursor() as cur:
+        cur.execute("/* q:archive_cutoff */ SELECT MAX(year) AS year FROM archived_years")
+        year = cur.fetchone()["year"]
+    _archive_cutoff[:] = [time.monotonic() + CATEGORY_TTL, date(year + 1, 1, 1) if year else None]
+    return _archive_cutoff[1]
+
+def ensure_archive_partition(cur, table: str, year: int) -> bool:
+    """Split p_future so `year` gets its own partition; False if an existing partition already covers it."""
+    cur.execute("""
+        SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    bounds = [r["bound"].strip("'") for r in cur.fetchall() if r["name"] != "p_future"]
+    if any(b > f"{year:04d}-01-01" for b in bounds):       # ISO dates compare as strings
+        return False
+    cur.execute(f"ALTER TABLE {table} REORGANIZE PARTITION p_future INTO ("
+                f"PARTITION p{year} VALUES LESS THAN ('{year + 1:04d}-01-01'), "
+                f"PARTITION p_future VALUES LESS THAN (MAXVALUE))")
+    return True
+
+def archive_year(year: int) -> dict:
+    """Move one year's live rows to the archive and rewrite its summaries; returns {kind: rows moved}.
+
+    Safe to re-run: rows added to an archived year later are moved on the
+    next run and the year's summaries are recomputed from the archive.
     """
-    if where: sql += " WHERE " + " AND ".join(where)
-    sql += " ORDER BY i.tx_date, i.id;"
-
+    start, end = date(year, 1, 1), date(year + 1, 1, 1)
+    with get_conn().cursor() as cur:           # DDL commits implicitly, so it runs before the transaction
+        for _, archive, _ in ARCHIVE_TABLES.values():
+            ensure_archive_partition(cur, archive, year)
+
+    moved = {}
+    with transaction() as cur:
+        for kind, (live, archive, cols) in ARCHIVE_TABLES.items():
+            # lock the year's rows so nothing is added or edited between the copy and the delete
+            cur.execute(f"SELECT COUNT(*) AS n FROM {live} WHERE tx_date >= %s AND tx_date < %s FOR UPDATE",
+                        (start, end))
+            moved[kind] = cur.fetchone()["n"]
+            if not moved[kind]:
+                continue
+            col_list = ", ".join(cols)
+            cur.execute(f"INSERT INTO {archive} ({col_list}) SELECT {col_list} FROM {live} "
+                        f"WHERE tx_date >= %s AND tx_date < %s", (start, end))
+            cur.execute(f"DELETE FROM {live} WHERE tx_date >= %s AND tx_date < %s", (start, end))
+            if cur.rowcount != moved[kind]:
+                raise RuntimeError(f"{live} {year}: locked {moved[kind]} rows but deleted {cur.rowcount}")
+        if not any(moved.values()):
+            return moved
+
+        cur.execute("DELETE FROM archive_totals WHERE period_start >= %s AND period_start < %s", (start, end))
+        for kind, (_, archive, _) in ARCHIVE_TABLES.items():
+            cur.execute(f"""
+                INSERT INTO archive_totals (grain, period_start, kind, category_id, total, tx_count)
+                SELECT 'month', DATE_SUB(tx_date, INTERVAL (DAYOFMONTH(tx_date) - 1) DAY) AS month, %s,
+                       category_id, SUM(amount), COUNT(*)
+                FROM {archive} WHERE tx_date >= %s AND tx_date < %s
+                GROUP BY month, category_id
+            """, (kind, start, end))
+        cur.execute("""
+            INSERT INTO archive_totals (grain, period_start, kind, category_id, total, tx_count)
+            SELECT 'year', %s, kind, category_id, SUM(total), SUM(tx_count)
+            FROM archive_totals WHERE grain = 'month' AND period_start >= %s AND period_start < %s
+            GROUP BY kind, category_id
+        """, (start, start, end))
+        cur.execute("""
+            INSERT INTO archived_years (year, expense_rows, income_rows)
+            SELECT %s, COALESCE(SUM(CASE WHEN kind = 'expense' THEN tx_count END), 0),
+                       COALESCE(SUM(CASE WHEN kind = 'income' THEN tx_count END), 0)
+            FROM archive_totals WHERE grain = 'year' AND period_start = %s
+            ON DUPLICATE KEY UPDATE expense_rows = VALUES(expense_rows), income_rows = VALUES(income_rows)
+        """, (year, start))
+    _archive_cutoff[0] = 0.0
+    return moved
+
+@app.cli.command("archive")
+@click.option("--keep-years", default=ARCHIVE_KEEP_YEARS, type=int, show_default=True,
+              help="Calendar years kept live, counting the current one.")
+@click.option("--dry-run", is_flag=True, help="Only list what would be moved.")
+def archive_cmd(keep_years, dry_run):
+    """Move closed years to the year-partitioned archive tables."""
+    if keep_years < 1:
+        raise click.BadParameter("must be at least 1", param_hint="--keep-years")
+    before = date(date.today().year - keep_years + 1, 1, 1)
     with get_conn().cursor() as cur:
-        cur.execute(sql, params)
+        cur.execute("""
+            SELECT YEAR(tx_date) AS year, 'expense' AS kind, COUNT(*) AS n FROM expenses WHERE tx_date < %s GROUP BY year
+            UNION ALL
+            SELECT YEAR(tx_date), 'income', COUNT(*) FROM incomes WHERE tx_date < %s GROUP BY YEAR(tx_date)
+        """, (before, before))
+        pending = {}
+        for r in cur.fetchall():
+            pending.setdefault(r["year"], {"expense": 0, "income": 0})[r["kind"]] = r["n"]
+    if not pending:
+        print(f"nothing to archive before {before.year}")
+        return
+    for year in sorted(pending):
+        started = time.perf_counter()
+        counts = pending[year] if dry_run else archive_year(year)
+        print(f"{year}: {counts['expense']:,} expenses, {counts['income']:,} incomes"
+              + (" would be archived" if dry_run else f" archived in {time.perf_counter() - started:.1f}s"))
+
+ARCHIVE_TOTALS_SQL = """
+    /* q:archive_totals */ SELECT a.period_start, a.kind, COALESCE(c.name, ic.name) AS label, a.total, a.tx_count
+    FROM archive_totals a
+    LEFT JOIN categories c ON a.kind = 'expense' AND c.id = a.category_id
+    LEFT JOIN income_categories ic ON a.kind = 'income' AND ic.id = a.category_id
+    WHERE a.grain = %s AND a.period_start >= %s AND a.period_start < %s
+    ORDER BY a.period_start, a.kind, a.category_id
+"""
+
+@app.route("/api/archive/totals")
+@cached_api
+def api_archive_totals():
+    """?grain=year|month&year=YYYY -> per-period income/expense of the archived rows, by category."""
+    grain = request.args.get("grain", "year")
+    if grain not in ("year", "month"):
+        return jsonify({"error": "grain must be year or month"}), 400
+    year = request.args.get("year", "")
+    if year and not (year.isdigit() and 1900 <= int(year) <= 2999):
+        return jsonify({"error": "year must be YYYY"}), 400
+    start, end = (date(int(year), 1, 1), date(int(year) + 1, 1, 1)) if year else (date(1, 1, 1), date(9999, 12, 31))
+    with get_conn().cursor() as cur:
+        cur.execute(ARCHIVE_TOTALS_SQL, (grain, start, end))
         rows = cur.fetchall()
 
-    fname = f'income_{(d_from or "")}_{(d_to or "")}.csv'.replace(":", "-")
-    return _csv_response(fname, ["id","date","category","amount","source","note"], rows)
+    periods = {}
+    for r in rows:
+        p = periods.setdefault(r["period_start"], {
+            "period": str(r["period_start"].year) if grain == "year" else bucket_label(r["period_start"], "month"),
+            "expense": 0.0, "income": 0.0, "expense_count": 0, "income_count": 0,
+            "by_category": {"expense": [], "income": []},
+        })
+        p[r["kind"]] = round(p[r["kind"]] + float(r["total"]), 2)
+        p[f"{r['kind']}_count"] += r["tx_count"]
+        p["by_category"][r["kind"]].append(
+            {"label": r["label"], "value": float(r["total"]), "count": r["tx_count"]})
+    for p in periods.values():
+        for cats in p["by_category"].values():
+            cats.sort(key=lambda c: -c["value"])
+    return jsonify({"grain": grain, "year": int(year) if year else None, "periods": list(periods.values())})
+
+# ---------- CSV IMPORT ----------
+# Same column layout as the exports, so an export can be re-imported as-is
+# (the id column is ignored; rows always get new ids).
+IMPORT_BATCH_ROWS = 1000   # rows validated and inserted per transaction
+IMPORT_MAX_ERRORS = 100    # rejected rows listed in the report (all are counted)
+FIELD_MAX_LEN = {"method": 20, "merchant": 120, "source": 120, "note": 255}   # column widths
+AMOUNT_MAX = 1e10          # DECIMAL(12,2) holds up to 9,999,999,999.99
+
+IMPORT_LAYOUTS = {
+    "expense": {
+        "table": "expenses",
+        "columns": ["tx_date", "category_id", "amount", "payment_method", "merchant", "note"],
+        "extra": ["method", "merchant", "note"],
+        "categories": get_categories,
+    },
+    "income": {
+        "table": "incomes",
+        "columns": ["tx_date", "category_id", "amount", "source", "note"],
+        "extra": ["source", "note"],
+        "categories": get_income_categories,
+    },
+}
+
+def parse_tx(kind: str, raw: dict, cats: dict) -> tuple:
+    """Validate one CSV row or JSON record -> (tx_date, category_id, amount, *extra) or raise ValueError(reason).
+
+    cats is {"ids": {...}, "names": {lower-cased name: id}} for the kind. The
+    category comes from an integer category_id or a category name; strings
+    are checked against the column widths so one bad row cannot fail a batch.
+    """
+    tx_date = parse_ymd(str(raw.get("date") or "").strip())
+    if not tx_date:
+        raise ValueError("date must be YYYY-MM-DD")
+    cat = raw.get("category_id")
+    if cat is not None:
+        cat_id = cat if type(cat) is int and cat in cats["ids"] else None
+    else:
+        cat = raw.get("category")
+        cat_id = cats["names"].get(str(cat or "").strip().lower())
+    if cat_id is None:
+        raise ValueError(f"unknown category {cat!r}")
+    try:
+        amount = float(raw.get("amount"))
+    except (TypeError, ValueError):
+        amount = 0
+    if not math.isfinite(amount) or not 0 < amount < AMOUNT_MAX:
+        raise ValueError(f"amount must be a number > 0 and < {AMOUNT_MAX:,.0f}")
+    extra = []
+    for k in IMPORT_LAYOUTS[kind]["extra"]:
+        v = raw.get(k)
+        v = str(v).strip() if v is not None else ""
+        if len(v) > FIELD_MAX_LEN[k]:
+            raise ValueError(f"{k} is longer than {FIELD_MAX_LEN[k]} characters")
+        extra.append(v or None)
+    return (tx_date, cat_id, round(amount, 2), *extra)
+
+def category_lookup(kind: str) -> dict:
+    """The cats argument of parse_tx() for a kind."""
+    rows = IMPORT_LAYOUTS[kind]["categories"]()
+    return {"ids": {c["id"] for c in rows}, "names": {c["name"].strip().lower(): c["id"] for c in rows}}
+
+def import_csv(kind: str, stream):
+    """Import an export-format CSV text stream in batches.
+
+    Returns {"accepted": n, "rejected": n, "errors": [(line, reason), ...]}.
+    Rows that fail validation are skipped, not fatal; each batch of valid rows
+    is inserted with executemany() and rolled into daily_totals in the same
+    transaction.
+    """
+    layout = IMPORT_LAYOUTS[kind]
+    result = {"accepted": 0, "rejected": 0, "errors": []}
+    reader = csv.DictReader(stream)
+    missing = {"date", "category", "amount"} - set(reader.fieldnames or [])
+    if missing:
+        result["errors"].append((1, "missing column(s): " + ", ".join(sorted(missing))))
+        return result
+
+    cats = category_lookup(kind)
+    batch = []
+    for line_no, row in enumerate(reader, start=2):
+        batch.append((line_no, row))
+        if len(batch) >= IMPORT_BATCH_ROWS:
+            _import_batch(kind, layout, cats, batch, result)
+            batch = []
+    if batch:
+        _import_batch(kind, layout, cats, batch, result)
+    return result
+
+def _import_batch(kind: str, layout: dict, cats: dict, batch: list, result: dict):
+    def reject(line_no, reason):
+        result["rejected"] += 1
+        if len(result["errors"]) < IMPORT_MAX_ERRORS:
+            result["errors"].append((line_no, reason))
+
+    values, buckets = [], {}
+    for line_no, row in batch:
+        row.pop("category_id", None)          # CSV category ids are not trusted; match by name
+        try:
+            tx_date, cat_id, amount_val, *extra = parse_tx(kind, row, cats)
+        except ValueError as e:
+            reject(line_no, str(e)); continue
+        values.append((tx_date, cat_id, amount_val, *extra))
+        bucket = buckets.setdefault((tx_date, cat_id), [0.0, 0])
+        bucket[0] += amount_val
+        bucket[1] += 1
+
+    if not values:
+        return
+    cols = layout["columns"]
+    with transaction() as cur:
+        cur.executemany(
+            f"INSERT INTO {layout['table']} ({', '.join(cols)}) VALUES ({', '.join(['%s'] * len(cols))})",
+            values)
+        bump_daily_totals(cur, kind, buckets)
+    result["accepted"] += len(values)
+
+@app.route("/import", methods=["GET", "POST"])
+def import_transactions():
+    kind = request.values.get("kind", "expense")
+    if kind not in IMPORT_LAYOUTS:
+        kind = "expense"
+    if request.method == "GET":
+        return render_template("import.html", kind=kind, result=None)
+
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        flash("Choose a CSV file to import.", "error")
+        return redirect(url_for("import_transactions", kind=kind))
+    result = import_csv(kind, io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline=""))
+    flash(f"Imported {result['accepted']} row(s), rejected {result['rejected']}.",
+          "ok" if result["accepted"] or not result["rejected"] else "error")
+    return render_template("import.html", kind=kind, result=result)
+
+@app.cli.command("import-csv")
+@click.argument("kind", type=click.Choice(sorted(IMPORT_LAYOUTS)))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def import_csv_cmd(kind, path):
+    """Bulk-load an expenses/income CSV (export column layout)."""
+    started = time.perf_counter()
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        result = import_csv(kind, f)
+    for line_no, reason in result["errors"]:
+        print(f"line {line_no}: {reason}")
+    print(f"accepted {result['accepted']}, rejected {result['rejected']} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+# ---------- BATCH SYNC ----------
+# POST /api/transactions/batch lets an offline client replay everything it
+# recorded in one request:
+#   {"records": [{"key": "<client id>", "kind": "expense"|"income", "date": "YYYY-MM-DD",
+#                 "category": "Food" | "category_id": 3, "amount": 12.5,
+#                 "method"/"merchant" (expense), "source" (income), "note": ...}, ...]}
+# Every record is validated first; the valid ones are written in one
+# transaction (one multi-row INSERT per kind, plus the rollups). Keys already
+# stored (migrations/0007), or repeated within the batch, come back as
+# "duplicate" with the existing id, so a retry after a lost response is safe.
+SYNC_MAX_RECORDS = int(os.getenv("MYWALLET_SYNC_MAX_RECORDS", "1000"))
+SYNC_RETRIES = 3           # a concurrent replay of the same keys can hit a duplicate key / deadlock
+
+def _sync_validate(rec, cats: dict):
+    """One record -> (kind, key, values tuple, tx_date, cat_id, amount) or raise ValueError(reason)."""
+    if not isinstance(rec, dict):
+        raise ValueError("record must be an object")
+    key, kind = rec.get("key"), rec.get("kind")
+    if not isinstance(key, str) or not 0 < len(key) <= 64:
+        raise ValueError("key must be a string of 1-64 characters")
+    if kind not in IMPORT_LAYOUTS:
+        raise ValueError("kind must be 'expense' or 'income'")
+    values = parse_tx(kind, rec, cats[kind])
+    return kind, key, (*values, key), values[0], values[1], values[2]
+
+def _sync_write(valid: dict):
+    """Insert {kind: {key: parsed}} in one transaction; returns ({kind: {key: id}} created, {kind: {key: id}} existing)."""
+    with transaction() as cur:
+        created, existing = {}, {}
+        for kind, recs in valid.items():
+            if not recs:
+                continue
+            layout = IMPORT_LAYOUTS[kind]
+            keys = list(recs)
+            marks = ", ".join(["%s"] * len(keys))
+            cur.execute(f"SELECT id, client_key FROM {layout['table']} WHERE client_key IN ({marks}) FOR UPDATE", keys)
+            existing[kind] = {r["client_key"]: r["id"] for r in cur.fetchall()}
+            new = [recs[k] for k in keys if k not in existing[kind]]
+            if not new:
+                continue
+            cols = layout["columns"] + ["client_key"]
+            cur.executemany(
+                f"INSERT INTO {layout['table']} ({', '.join(cols)}) VALUES ({', '.join(['%s'] * len(cols))})",
+                [p[2] for p in new])
+            buckets = {}
+            for _, _, _, tx_date, cat_id, amount in new:
+                bucket = buckets.setdefault((tx_date, cat_id), [0.0, 0])
+                bucket[0] += amount
+                bucket[1] += 1
+            bump_daily_totals(cur, kind, buckets)
+            new_keys = [p[1] for p in new]
+            cur.execute(f"SELECT id, client_key FROM {layout['table']} WHERE client_key IN ({', '.join(['%s'] * len(new_keys))})",
+                        new_keys)
+            created[kind] = {r["client_key"]: r["id"] for r in cur.fetchall()}
+    return created, existing
+
+@app.route("/api/transactions/batch", methods=["POST"])
+def api_transactions_batch():
+    body = request.get_json(silent=True)
+    records = body.get("records") if isinstance(body, dict) else None
+    if not isinstance(records, list):
+        return jsonify({"error": 'expected a JSON object {"records": [...]}'}), 400
+    if len(records) > SYNC_MAX_RECORDS:
+        return jsonify({"error": f"at most {SYNC_MAX_RECORDS} records per request"}), 413
+
+    cats = {kind: category_lookup(kind) for kind in IMPORT_LAYOUTS}
+
+    outcome, valid = [], {"expense": {}, "income": {}}
+    for rec in records:
+        try:
+            parsed = _sync_validate(rec, cats)
+        except ValueError as e:
+            key = rec.get("key") if isinstance(rec, dict) else None
+            outcome.append((key, None, {"status": "invalid", "error": str(e)}))
+            continue
+        kind, key = parsed[0], parsed[1]
+        if key in valid[kind]:
+            outcome.append((key, kind, {"status": "duplicate"}))     # repeated within this batch
+        else:
+            valid[kind][key] = parsed
+            outcome.append((key, kind, None))
+
+    created = existing = {}
+    for attempt in range(SYNC_RETRIES if any(valid.values()) else 0):
+        try:
+            created, existing = _sync_write(valid)
+            break
+        except (pymysql.err.IntegrityError, pymysql.err.OperationalError) as e:
+            if e.args[0] not in (1062, 1213) or attempt == SYNC_RETRIES - 1:
+                raise
+
+    results, counts = [], {"created": 0, "duplicate": 0, "invalid": 0}
+    for key, kind, res in outcome:
+        if res is None and key in created.get(kind, {}):
+            res = {"status": "created", "id": created[kind][key]}
+        elif res is None or res["status"] == "duplicate":
+            res = {"status": "duplicate", "id": created.get(kind, {}).get(key) or existing.get(kind, {}).get(key)}
+        counts[res["status"]] += 1
+        results.append({"key": key, **({"kind": kind} if kind else {}), **res})
+    return jsonify({**counts, "results": results})
+
+# ---------- METRICS / HEALTH ----------
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_timing(resp):
+    started = g.get("request_started")
+    if started is None:
+        return resp
+    elapsed = time.perf_counter() - started
+    db_seconds, db_queries = g.get("db_seconds", 0.0), g.get("db_queries", 0)
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.observe_request(route, request.method, resp.status_code, elapsed)
+    # streamed bodies (CSV exports) are still being produced; this times the handler
+    resp.headers["Server-Timing"] = (f'db;dur={db_seconds * 1000:.1f};desc="{db_queries} queries", '
+                                     f"app;dur={elapsed * 1000:.1f}")
+    return resp
+
+@app.route("/metrics")
+def metrics_endpoint():
+    st = pool.stats()
+    gauges = {
+        "mywallet_db_pool_size": ("Configured maximum pool connections.", st["size"]),
+        "mywallet_db_pool_open": ("Open pooled connections.", st["open"]),
+        "mywallet_db_pool_in_use": ("Connections checked out.", st["in_use"]),
+        "mywallet_db_pool_waiting": ("Requests waiting for a connection.", st["waiting"]),
+        "mywallet_db_pool_timeouts": ("Checkouts that gave up waiting (cumulative).", st["timeouts"]),
+        "mywallet_db_batch_pool_open": ("Open run_batch() connections.", batch_pool.stats()["open"]),
+    }
+    return Response(metrics.render(gauges), content_type="text/plain; version=0.0.4; charset=utf-8")
 
-# ---------- misc ----------
 @app.route("/health")
 def health():
-    return {"status": "ok"}
+    """Liveness plus a real DB round-trip; 503 when the database is unreachable."""
+    started = time.perf_counter()
+    try:
+        with get_conn().cursor() as cur:
+            cur.execute("/* q:health */ SELECT 1")
+            cur.fetchone()
+        db = {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+    except (PoolTimeout, pymysql.err.MySQLError) as e:
+        db = {"ok": False, "error": str(e)}
+    body = {"status": "ok" if db["ok"] else "degraded", "db": db, "pool": pool.stats(),
+            "batch_pool": batch_pool.stats()}
+    return body, 200 if db["ok"] else 503
+
+# ---------- COMPRESSION ----------
+# WSGI middleware around app.wsgi_app that gzips text responses for clients
+# that accept it. Bodies are compressed as they are produced, so the streamed
+# CSV exports never get buffered; each chunk ends with a sync flush so the
+# client can decode rows as they arrive. A gzipped response's ETag gets a
+# "-gzip" suffix (it is a different representation), and the suffix is
+# stripped from If-None-Match before the app compares ETags.
+GZIP_ENABLED = os.getenv("MYWALLET_GZIP", "1") == "1"
+GZIP_MIN_SIZE = int(os.getenv("MYWALLET_GZIP_MIN_SIZE", "1024"))    # bytes; smaller bodies are not worth it
+GZIP_LEVEL = int(os.getenv("MYWALLET_GZIP_LEVEL", "6"))
+GZIP_TYPES = {"application/json", "text/csv", "text/html", "text/plain", "text/css",
+              "text/javascript", "application/javascript", "image/svg+xml"}
+
+def accepts_gzip(header: str) -> bool:
+    """Accept-Encoding allows gzip (explicitly or via *) with q > 0."""
+    gzip_q = star_q = None
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        coding = coding.strip().lower()
+        if coding in ("gzip", "x-gzip"):
+            gzip_q = q
+        elif coding == "*":
+            star_q = q
+    if gzip_q is not None:
+        return gzip_q > 0
+    return bool(star_q)
+
+class _GzipBody:
+    """Compresses an app_iter chunk by chunk; close() always reaches the inner iterable."""
+    def __init__(self, app_iter, compressor, sync_flush: bool):
+        self.app_iter = app_iter
+        self.compressor = compressor
+        self.flush_mode = zlib.Z_SYNC_FLUSH if sync_flush else zlib.Z_NO_FLUSH
+
+    def __iter__(self):
+        for chunk in self.app_iter:
+            out = self.compressor.compress(chunk)
+            if self.flush_mode != zlib.Z_NO_FLUSH:
+                out += self.compressor.flush(self.flush_mode)
+            if out:
+                yield out
+        yield self.compressor.flush(zlib.Z_FINISH)
+
+    def close(self):
+        close = getattr(self.app_iter, "close", None)
+        if close:
+            close()
+
+class GzipMiddleware:
+    def __init__(self, wsgi_app, min_size: int = GZIP_MIN_SIZE, level: int = GZIP_LEVEL):
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+        self.level = level
+
+    def __call__(self, environ, start_response):
+        if not accepts_gzip(environ.get("HTTP_ACCEPT_ENCODING", "")):
+            return self.wsgi_app(environ, start_response)
+        inm = environ.get("HTTP_IF_NONE_MATCH")
+        stripped = bool(inm) and '-gzip"' in inm
+        if stripped:
+            environ["HTTP_IF_NONE_MATCH"] = inm.replace('-gzip"', '"')
+        head = environ.get("REQUEST_METHOD") == "HEAD"
+        state = {}
+
+        def gzip_start_response(status, headers, exc_info=None):
+            code = int(status[:3])
+            h = {k.lower(): v for k, v in headers}
+            mimetype = h.get("content-type", "").split(";")[0].strip().lower()
+            length = h.get("content-length")
+            # HEAD gets the headers the matching GET would get, just no body to compress
+            gzipped = (code == 200 and mimetype in GZIP_TYPES
+                       and "content-encoding" not in h
+                       and "no-transform" not in h.get("cache-control", "")
+                       and (length is None or int(length) >= self.min_size))
+            compress = gzipped and not head
+            if (mimetype in GZIP_TYPES or code == 304) and "accept-encoding" not in h.get("vary", "").lower():
+                vary = ", ".join(v for v in (h.get("vary"), "Accept-Encoding") if v)
+                headers = [(k, v) for k, v in headers if k.lower() != "vary"] + [("Vary", vary)]
+            if gzipped or (code == 304 and stripped):
+                # a 304 for a "-gzip" validator confirms the gzip variant, so it names that ETag too
+                headers = [(k, _gzip_etag(v) if k.lower() == "etag" else v)
+                           for k, v in headers if not (gzipped and k.lower() == "content-length")]
+            if gzipped:
+                headers.append(("Content-Encoding", "gzip"))
+            if compress:
+                state["compressor"] = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+                state["streamed"] = length is None
+            write = start_response(status, headers, exc_info)
+            if not compress:
+                return write
+            return lambda data: write(state["compressor"].compress(data)
+                                      + state["compressor"].flush(zlib.Z_SYNC_FLUSH))
+
+        app_iter = self.wsgi_app(environ, gzip_start_response)
+        if "compressor" not in state:
+            return app_iter
+        return _GzipBody(app_iter, state["compressor"], sync_flush=state["streamed"])
+
+def _gzip_etag(etag: str) -> str:
+    if etag.endswith('"') and not etag.endswith('-gzip"'):
+        return etag[:-1] + '-gzip"'
+    return etag
+
+if GZIP_ENABLED:
+    app.wsgi_app = GzipMiddleware(app.wsgi_app)
+
+# ---------- PRODUCTION SERVING ----------
+# `flask --app src.app serve` runs the app under waitress instead of the
+# Werkzeug dev server: no debugger or reloader, templates compiled once, and
+# static files cached for a year behind content-hashed URLs. SIGINT/SIGTERM
+# stop accepting, let in-flight requests finish (up to the drain timeout),
+# then close the pool.
+SERVE_HOST = os.getenv("MYWALLET_HOST", "127.0.0.1")
+SERVE_PORT = int(os.getenv("MYWALLET_PORT", "5000"))
+SERVE_THREADS = int(os.getenv("MYWALLET_THREADS", str(POOL_SIZE)))   # more threads than connections just queue on the pool
+SERVE_CONNECTION_LIMIT = int(os.getenv("MYWALLET_CONNECTION_LIMIT", "100"))
+SERVE_CHANNEL_TIMEOUT = int(os.getenv("MYWALLET_CHANNEL_TIMEOUT", "60"))
+SERVE_DRAIN_TIMEOUT = float(os.getenv("MYWALLET_DRAIN_TIMEOUT", "30"))
+STATIC_MAX_AGE = int(os.getenv("MYWALLET_STATIC_MAX_AGE", str(365 * 24 * 3600)))
+
+_static_versions = {}         # filename -> (mtime, content hash)
+
+@app.url_defaults
+def static_fingerprint(endpoint, values):
+    """url_for('static', ...) gets ?v=<content hash>, so a changed file gets a new URL."""
+    if endpoint != "static" or "filename" not in values or "v" in values:
+        return
+    filename = values["filename"]
+    try:
+        mtime = os.stat(os.path.join(app.static_folder, filename)).st_mtime
+    except OSError:
+        return
+    cached = _static_versions.get(filename)
+    if not cached or cached[0] != mtime:
+        with open(os.path.join(app.static_folder, filename), "rb") as f:
+            cached = _static_versions[filename] = (mtime, hashlib.sha1(f.read()).hexdigest()[:10])
+    values["v"] = cached[1]
+
+def configure_production():
+    app.config.update(DEBUG=False, TEMPLATES_AUTO_RELOAD=False, SEND_FILE_MAX_AGE_DEFAULT=STATIC_MAX_AGE)
+    app.jinja_env.auto_reload = False
+    precompile_templates()
+
+def serve_until_signalled(server, drain_timeout: float):
+    """Run a waitress server until SIGINT/SIGTERM/SIGBREAK, then drain it."""
+    import signal
+    from waitress import wasyncore
+    from waitress.channel import HTTPChannel
+    from waitress.server import BaseWSGIServer
+
+    socket_map = getattr(server, "map", None) or server._map      # MultiSocketServer when host has several addresses
+    use_poll = server.adj.asyncore_use_poll
+    stop = []
+    for name in ("SIGINT", "SIGTERM", "SIGBREAK"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), lambda signum, frame: stop.append(signum))
+    while not stop:
+        wasyncore.loop(timeout=server.adj.asyncore_loop_timeout, map=socket_map, use_poll=use_poll, count=1)
+
+    print("Stopping: no new connections, draining in-flight requests...")
+    for listener in [d for d in socket_map.values() if isinstance(d, BaseWSGIServer)]:
+        wasyncore.dispatcher.close(listener)        # closes the listen socket but keeps the wake-up trigger
+    deadline = time.monotonic() + drain_timeout
+    while True:
+        channels = [d for d in list(socket_map.values()) if isinstance(d, HTTPChannel)]
+        if not channels or time.monotonic() >= deadline:
+            break
+        for ch in channels:
+            if not ch.requests and not ch.total_outbufs_len:
+                ch.will_close = True                # idle keep-alive connection
+        wasyncore.loop(timeout=0.1, map=socket_map, use_poll=use_poll, count=1)
+    if channels:
+        print(f"Drain timeout: closing {len(channels)} connection(s) with requests still running")
+    server.task_dispatcher.shutdown(cancel_pending=True, timeout=5)
+    wasyncore.close_all(socket_map)
+    pool.close_idle()
+    batch_pool.close_idle()
+    print("Stopped.")
+
+@app.cli.command("serve")
+@click.option("--host", default=SERVE_HOST, show_default=True)
+@click.option("--port", default=SERVE_PORT, type=int, show_default=True)
+@click.option("--threads", default=SERVE_THREADS, type=int, show_default=True,
+              help="Worker threads (defaults to the DB pool size).")
+@click.option("--connection-limit", default=SERVE_CONNECTION_LIMIT, type=int, show_default=True,
+              help="Open client connections before waitress stops accepting.")
+@click.option("--channel-timeout", default=SERVE_CHANNEL_TIMEOUT, type=int, show_default=True,
+              help="Seconds an idle client connection is kept open.")
+@click.option("--drain-timeout", default=SERVE_DRAIN_TIMEOUT, type=float, show_default=True,
+              help="Seconds to let in-flight requests finish on shutdown.")
+def serve_cmd(host, port, threads, connection_limit, channel_timeout, drain_timeout):
+    """Serve the app with waitress and production settings."""
+    from waitress.server import create_server
+
+    try:
+        with pool.connection() as conn:
+            conn.ping(reconnect=False)
+    except Exception as e:
+        raise click.ClickException(f"database {CFG['host']}:{CFG['port']}/{CFG['database']} is unreachable: {e}")
+    configure_production()
+    if app.secret_key == "dev-change-this":
+        print("Warning: MYWALLET_SECRET_KEY is not set; using the development secret key")
+    server = create_server(app, host=host, port=port, threads=threads, connection_limit=connection_limit,
+                           channel_timeout=channel_timeout, ident="mywallet")
+    print(f"Serving on http://{host}:{port} ({threads} threads, pool size {POOL_SIZE})")
+    serve_until_signalled(server, drain_timeout)
+
+# ---------- startup ----------
+def startup():
+    with app.app_context():
+        if AUTO_MIGRATE:
+            try:
+                for fname in migrate():
+                    print("Migrated:", fname)
+            except Exception as e:
+                print("Migration warning:", e)
+        try:
+            seed_defaults()
+        except Exception as e:
+            print("Seed warning:", e)
+
+startup()
 
 if __name__ == "__main__":
-    import os
-    DEBUG = os.getenv("MYWALLET_DEBUG", "1") == "1"  # your BAT can set this to 0/1
+    DEBUG = os.getenv("MYWALLET_DEBUG", "0") == "1"  # the dev BAT sets 1; use `flask serve` in production
     if DEBUG:
         app.config.update(TEMPLATES_AUTO_RELOAD=True, SEND_FILE_MAX_AGE_DEFAULT=0)
     app.run(host="127.0.0.1", port=5000, debug=DEBUG)
@@ -0,0 +1 @@
+"""Benchmark and load-test suite for the MyWallet app (see ``python -m bench --help``)."""
@@ -0,0 +1,166 @@
+# src/bench/__main__.py
+"""Benchmark CLI. Run from src/:
+
+    python -m bench seed --rows 1000000 --years 5 --reset
+    python -m bench run --transport both --requests 200 --concurrency 8 --out baseline.json
+    python -m bench run --embedded --rows 100000 --out baseline.json
+    python -m bench run --embedded --rows 2000000 --only q= --transport client
+    python -m bench compare baseline.json after.json
+
+seed/run use the database app.py is configured for (MYWALLET_DB_* env vars).
+--embedded instead starts a throwaway local mariadbd/mysqld, seeds it and
+removes it afterwards.
+"""
+from datetime import datetime
+import argparse, importlib, json, os, platform, sys, time
+
+from bench import datagen, runner
+from bench.embedded import EmbeddedServer
+
+
+def load_app():
+    # imported lazily: app.py reads MYWALLET_DB_* and migrates at import time
+    return importlib.import_module("app")
+
+
+def table_counts(app_module):
+    with app_module.app.app_context():
+        with app_module.get_conn().cursor() as cur:
+            cur.execute("SELECT (SELECT COUNT(*) FROM expenses) AS expenses, (SELECT COUNT(*) FROM incomes) AS incomes")
+            return cur.fetchone()
+
+
+def seed(app_module, rows, years, rng_seed, reset=False, append=False):
+    existing = table_counts(app_module)
+    if (existing["expenses"] or existing["incomes"]) and not (reset or append):
+        sys.exit(f"{app_module.CFG['database']} already has {existing['expenses']} expenses / "
+                 f"{existing['incomes']} incomes; pass --reset to wipe them or --append to add to them")
+
+    conn = app_module.pymysql.connect(**app_module.CFG)
+    try:
+        if reset:
+            with conn.cursor() as cur:
+                for table in ("expenses", "incomes", "daily_totals", "category_month_spend",
+                              "expenses_archive", "incomes_archive", "archive_totals", "archived_years"):
+                    cur.execute(f"DELETE FROM {table}")
+        started = time.perf_counter()
+
+        def progress(done):
+            if done % 100_000 < 5000:
+                print(f"  {done:>10,} rows  {done / (time.perf_counter() - started):,.0f} rows/s", flush=True)
+
+        counts = datagen.seed_database(conn, rows, years, rng_seed, progress=progress)
+    finally:
+        conn.close()
+    with app_module.app.app_context():
+        app_module.invalidate_categories()
+        buckets = app_module.rebuild_daily_totals()
+        app_module.reconcile_month_spend()
+    print(f"seeded {counts['expenses']:,} expenses + {counts['incomes']:,} incomes "
+          f"({buckets:,} daily buckets) in {time.perf_counter() - started:.1f}s")
+
+
+def cmd_seed(args):
+    with _maybe_embedded(args):
+        seed(load_app(), args.rows, args.years, args.seed, args.reset, args.append)
+        if args.embedded:
+            print("note: the embedded server is removed on exit; use `run --embedded` to seed and measure together")
+
+
+def cmd_run(args):
+    with _maybe_embedded(args):
+        app_module = load_app()
+        if args.embedded:
+            seed(app_module, args.rows, args.years, args.seed)
+        transports = ["client", "http"] if args.transport == "both" else [args.transport]
+        routes = None
+        if args.only:
+            routes = [r for r in runner.build_routes(app_module) if any(s in r for s in args.only)]
+        report = {
+            "meta": {
+                "started": datetime.now().isoformat(timespec="seconds"),
+                "requests_per_route": args.requests,
+                "concurrency": args.concurrency,
+                "rows": table_counts(app_module),
+                "pool_size": app_module.POOL_SIZE,
+                "python": platform.python_version(),
+                "embedded": bool(args.embedded),
+            },
+            "routes": {},
+        }
+        for transport in transports:
+            print(f"\n== {transport} ==")
+            results = runner.run(app_module, transport, args.requests, args.concurrency, args.warmup, routes)
+            for path, stats in results.items():
+                report["routes"][f"{transport} {path}"] = stats
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\nwrote {args.out}")
+
+
+def cmd_compare(args):
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    regressed = runner.compare(base, new, args.threshold)
+    if regressed:
+        sys.exit(f"{len(regressed)} route(s) slower by more than {args.threshold:g}%")
+
+
+class _maybe_embedded:
+    """Context manager: start an EmbeddedServer and export its env when --embedded."""
+    def __init__(self, args):
+        self.server = EmbeddedServer() if getattr(args, "embedded", False) else None
+
+    def __enter__(self):
+        if self.server:
+            print("starting embedded database server…", flush=True)
+            self.server.start()
+            os.environ.update(self.server.env())
+
+    def __exit__(self, *exc):
+        if self.server:
+            self.server.stop()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench", description="MyWallet benchmarks")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    def data_args(sp, rows):
+        sp.add_argument("--rows", type=int, default=rows, help="transactions to generate (e.g. 10000, 1000000, 10000000)")
+        sp.add_argument("--years", type=float, default=5, help="history length the rows are spread over")
+        sp.add_argument("--seed", type=int, default=42, help="random seed (same seed, same data)")
+        sp.add_argument("--embedded", action="store_true", help="use a throwaway local mariadbd/mysqld")
+
+    sp = sub.add_parser("seed", help="fill the database with synthetic transactions")
+    data_args(sp, 10_000)
+    sp.add_argument("--reset", action="store_true", help="delete existing transactions first")
+    sp.add_argument("--append", action="store_true", help="add to existing transactions")
+    sp.set_defaults(func=cmd_seed)
+
+    sp = sub.add_parser("run", help="measure every route")
+    data_args(sp, 10_000)
+    sp.add_argument("--transport", choices=["client", "http", "both"], default="both")
+    sp.add_argument("--requests", type=int, default=200, help="requests per route")
+    sp.add_argument("--concurrency", type=int, default=4)
+    sp.add_argument("--warmup", type=int, default=5, help="unmeasured requests per route first")
+    sp.add_argument("--only", action="append", metavar="TEXT",
+                    help="only routes containing TEXT (repeatable), e.g. --only q=")
+    sp.add_argument("--out", help="write the JSON report here")
+    sp.set_defaults(func=cmd_run)
+
+    sp = sub.add_parser("compare", help="diff two JSON reports")
+    sp.add_argument("base")
+    sp.add_argument("new")
+    sp.add_argument("--threshold", type=float, default=10.0, help="percent slowdown that counts as a regression")
+    sp.set_defaults(func=cmd_compare)
+
+    args = p.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
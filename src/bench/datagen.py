@@ -0,0 +1,146 @@
+# src/bench/datagen.py
+"""Synthetic transaction history for benchmarking.
+
+Volumes, category mix and amounts are loosely modelled on a household ledger:
+many small food/transport expenses, a few large monthly bills, one salary per
+month and occasional side income. Everything comes from one seeded
+random.Random, so the same arguments always produce the same data.
+"""
+from datetime import date, timedelta
+import random
+
+# name -> (share of expense rows, median amount, spread)
+EXPENSE_CATEGORIES = {
+    "Food":          (0.30,   1200, 0.6),
+    "Transport":     (0.15,    450, 0.5),
+    "Shopping":      (0.12,   3500, 0.9),
+    "Entertainment": (0.08,   2000, 0.7),
+    "Utilities":     (0.08,   6000, 0.4),
+    "Health":        (0.05,   4000, 0.8),
+    "Education":     (0.05,   8000, 0.6),
+    "Rent":          (0.03,  45000, 0.1),
+    "Other":         (0.14,   1500, 1.0),
+}
+INCOME_CATEGORIES = {
+    "Salary":      (0.35, 180000, 0.15),
+    "Freelance":   (0.30,  35000, 0.7),
+    "Tuition fee": (0.15,  15000, 0.3),
+    "Interest":    (0.10,   2500, 0.5),
+    "Gifts":       (0.10,  10000, 0.8),
+}
+MERCHANTS = ["Keells", "Cargills", "Arpico", "Uber", "PickMe", "Dialog", "CEB", "Daraz",
+             "Odel", "Pizza Hut", "KFC", "Softlogic", "Abans", "Nawaloka", "Shell", None]
+PAYMENT_METHODS = (["Cash", "Card", "Bank", "Mobile", "Other"], [0.35, 0.35, 0.15, 0.12, 0.03])
+SOURCES = ["Employer", "Client", "Bank", "Family", None]
+NOTES = ["", "", "", "monthly", "weekend", "shared", "gift", "refund pending", "office"]
+
+INCOME_SHARE = 0.12   # fraction of generated rows that are incomes
+
+
+def ensure_categories(cur):
+    """Create any missing benchmark categories; returns ({name: id} expense, {name: id} income)."""
+    ids = []
+    for table, names in (("categories", EXPENSE_CATEGORIES), ("income_categories", INCOME_CATEGORIES)):
+        for name in names:
+            cur.execute(f"SELECT id FROM {table} WHERE name=%s LIMIT 1", (name,))
+            if not cur.fetchone():
+                cur.execute(f"INSERT INTO {table} (name) VALUES (%s)", (name,))
+        cur.execute(f"SELECT id, name FROM {table}")
+        ids.append({r["name"]: r["id"] for r in cur.fetchall() if r["name"] in names})
+    return ids[0], ids[1]
+
+
+def _weekday_weights(start: date, days: int):
+    # weekends and the days right after payday see more spending
+    weights = []
+    for i in range(days):
+        d = start + timedelta(days=i)
+        w = 1.4 if d.weekday() >= 5 else 1.0
+        if d.day in (25, 26, 27, 28):
+            w *= 1.3
+        weights.append(w)
+    return weights
+
+
+def generate(rows: int, years: float, seed: int = 42, end: date = None):
+    """Yield ("expense"|"income", tx_date, category_name, amount, method_or_source, merchant, note).
+
+    Rows are spread over the `years` before `end` (default today).
+    """
+    rng = random.Random(seed)
+    end = end or date.today()
+    days = max(1, int(years * 365))
+    start = end - timedelta(days=days - 1)
+    day_weights = _weekday_weights(start, days)
+    exp_names, exp_w = list(EXPENSE_CATEGORIES), [v[0] for v in EXPENSE_CATEGORIES.values()]
+    inc_names, inc_w = list(INCOME_CATEGORIES), [v[0] for v in INCOME_CATEGORIES.values()]
+    methods, method_w = PAYMENT_METHODS
+
+    # draw dates in blocks; choices() with cum_weights is far cheaper than per-row weights
+    cum, total = [], 0.0
+    for w in day_weights:
+        total += w
+        cum.append(total)
+
+    block = 10_000
+    for offset in range(0, rows, block):
+        n = min(block, rows - offset)
+        day_idx = rng.choices(range(days), cum_weights=cum, k=n)
+        for i in day_idx:
+            tx_date = start + timedelta(days=i)
+            note = rng.choice(NOTES) or None
+            if rng.random() < INCOME_SHARE:
+                cat = rng.choices(inc_names, inc_w)[0]
+                _, median, spread = INCOME_CATEGORIES[cat]
+                amount = round(median * rng.lognormvariate(0, spread), 2)
+                yield ("income", tx_date, cat, amount, rng.choice(SOURCES), None, note)
+            else:
+                cat = rng.choices(exp_names, exp_w)[0]
+                _, median, spread = EXPENSE_CATEGORIES[cat]
+                amount = max(1.0, round(median * rng.lognormvariate(0, spread), 2))
+                yield ("expense", tx_date, cat, amount,
+                       rng.choices(methods, method_w)[0], rng.choice(MERCHANTS), note)
+
+
+def seed_database(conn, rows: int, years: float, seed: int = 42, batch: int = 5000, progress=None):
+    """Insert `rows` generated transactions through `conn` with batched executemany().
+
+    Returns {"expenses": n, "incomes": n}. The caller rebuilds daily_totals afterwards.
+    """
+    with conn.cursor() as cur:
+        exp_ids, inc_ids = ensure_categories(cur)
+
+    counts = {"expenses": 0, "incomes": 0}
+    exp_rows, inc_rows = [], []
+
+    def flush():
+        with conn.cursor() as cur:
+            conn.begin()
+            if exp_rows:
+                cur.executemany("""
+                    INSERT INTO expenses (tx_date, category_id, amount, payment_method, merchant, note)
+                    VALUES (%s,%s,%s,%s,%s,%s)
+                """, exp_rows)
+            if inc_rows:
+                cur.executemany("""
+                    INSERT INTO incomes (tx_date, category_id, amount, source, note)
+                    VALUES (%s,%s,%s,%s,%s)
+                """, inc_rows)
+            conn.commit()
+        counts["expenses"] += len(exp_rows)
+        counts["incomes"] += len(inc_rows)
+        exp_rows.clear()
+        inc_rows.clear()
+        if progress:
+            progress(counts["expenses"] + counts["incomes"])
+
+    for kind, tx_date, cat, amount, method_or_source, merchant, note in generate(rows, years, seed):
+        if kind == "expense":
+            exp_rows.append((tx_date, exp_ids[cat], amount, method_or_source, merchant, note))
+        else:
+            inc_rows.append((tx_date, inc_ids[cat], amount, method_or_source, note))
+        if len(exp_rows) + len(inc_rows) >= batch:
+            flush()
+    if exp_rows or inc_rows:
+        flush()
+    return counts
@@ -0,0 +1,100 @@
+# src/bench/embedded.py
+"""Throwaway local MariaDB/MySQL server for benchmarks.
+
+Uses whatever mariadbd/mysqld binary is installed (XAMPP ships one). It
+initialises a fresh data directory in a temp folder, listens on 127.0.0.1 on
+a free port, and is deleted again on stop(). Nothing outside this machine
+is involved.
+"""
+import os, shutil, socket, subprocess, tempfile, time
+
+import pymysql
+
+
+def _find(*names):
+    extra = [r"C:\xampp\mysql\bin"]          # XAMPP is not usually on PATH
+    for name in names:
+        path = shutil.which(name) or shutil.which(name, path=os.pathsep.join(extra))
+        if path:
+            return path
+    return None
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class EmbeddedServer:
+    """Start with start(), point the app at .env(), stop() to tear everything down."""
+
+    def __init__(self, database: str = "expense_bench"):
+        self.database = database
+        self.port = _free_port()
+        self.datadir = None
+        self.proc = None
+
+    def start(self, timeout: float = 60):
+        server = _find("mariadbd", "mysqld")
+        if not server:
+            raise RuntimeError("no mariadbd/mysqld binary found; install MariaDB, or drop --embedded and point MYWALLET_DB_* at a server")
+        self.datadir = tempfile.mkdtemp(prefix="mywallet-bench-")
+        data = os.path.join(self.datadir, "data")
+        base = ["--no-defaults", f"--datadir={data}"]
+        if hasattr(os, "geteuid") and os.geteuid() == 0:
+            base.append("--user=root")             # mysqld refuses to run as root otherwise
+
+        installer = _find("mariadb-install-db", "mysql_install_db")   # MariaDB; MySQL 8 has neither
+        if installer:
+            subprocess.run([installer, *base, "--auth-root-authentication-method=normal", "--skip-test-db"],
+                           check=True, capture_output=True)
+        else:
+            subprocess.run([server, *base, "--initialize-insecure"], check=True, capture_output=True)
+
+        self.proc = subprocess.Popen(
+            [server, *base, f"--port={self.port}", "--bind-address=127.0.0.1",
+             f"--socket={os.path.join(self.datadir, 'mysqld.sock')}",
+             f"--pid-file={os.path.join(self.datadir, 'mysqld.pid')}",
+             "--innodb-buffer-pool-size=512M", "--innodb-flush-log-at-trx-commit=2",
+             "--skip-log-bin", "--max-connections=500"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                con = pymysql.connect(host="127.0.0.1", port=self.port, user="root", password="")
+                break
+            except pymysql.err.OperationalError:
+                if self.proc.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError("embedded database server did not start")
+                time.sleep(0.5)
+        with con.cursor() as cur:
+            cur.execute(f"CREATE DATABASE IF NOT EXISTS `{self.database}` CHARACTER SET utf8mb4")
+        con.close()
+        return self
+
+    def env(self) -> dict:
+        """MYWALLET_DB_* settings that point app.py at this server."""
+        return {"MYWALLET_DB_HOST": "127.0.0.1", "MYWALLET_DB_PORT": str(self.port),
+                "MYWALLET_DB_USER": "root", "MYWALLET_DB_PASSWORD": "",
+                "MYWALLET_DB_NAME": self.database}
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(30)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self.proc = None
+        if self.datadir:
+            shutil.rmtree(self.datadir, ignore_errors=True)
+            self.datadir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
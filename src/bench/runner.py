@@ -0,0 +1,204 @@
+# src/bench/runner.py
+"""Drive the app's GET routes and measure latency, throughput and queries/request.
+
+Two transports:
+  client  Flask test client in-process: no network, isolates app + DB cost.
+  http    the app on a real threaded WSGI server, hit over HTTP with urllib.
+Each transport runs `concurrency` workers that keep taking the next request
+off a shared schedule until `requests` per route have been made.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import math, re, threading, time, urllib.error, urllib.request
+
+from flask import g
+
+
+def build_routes(app_module):
+    """The route list, with ids/cursors that hit real rows in the seeded data."""
+    app = app_module.app
+    with app.app_context():
+        with app_module.get_conn().cursor() as cur:
+            cur.execute("SELECT COUNT(*) AS n FROM expenses")
+            n = cur.fetchone()["n"]
+            cur.execute("SELECT tx_date, id FROM expenses ORDER BY tx_date DESC, id DESC LIMIT 1 OFFSET %s",
+                        (n // 2,))
+            mid = cur.fetchone()
+            cur.execute("SELECT category_id FROM expenses LIMIT 1")
+            cat = cur.fetchone()
+    deep = f"{mid['tx_date'].isoformat()}_{mid['id']}" if mid else "2000-01-01_1"
+    cat_id = cat["category_id"] if cat else 1
+    month_ago = (date.today() - timedelta(days=30)).isoformat()
+    years_ago = (date.today() - timedelta(days=10 * 365)).isoformat()
+    return [
+        "/",
+        "/analytics",
+        "/expenses",
+        f"/expenses?category_id={cat_id}",
+        f"/expenses?after={deep}",
+        "/income",
+        "/?fragment=1",
+        f"/expenses?category_id={cat_id}&fragment=1",
+        "/income?fragment=1",
+        "/api/summary",
+        "/api/expense_by_category",
+        "/api/income_by_category",
+        "/api/cashflow_daily?days=90",
+        "/api/monthly_totals?months=24",
+        "/api/analytics?days=90&months=24",
+        "/api/budgets",
+        f"/api/series?from={years_ago}",
+        f"/api/series?from={years_ago}&bucket=day",
+        "/api/expenses",
+        f"/api/expenses?after={deep}",
+        "/api/income",
+        "/expenses?q=keells",
+        "/expenses?q=car",
+        f"/expenses?q=refund&category_id={cat_id}",
+        f"/expenses?q=keells&after={deep}",
+        "/income?q=employer",
+        "/api/expenses?q=pizza",
+        f"/export/expenses.csv?from={month_ago}",
+        f"/export/income.csv?from={month_ago}",
+        f"/export/expenses.csv?q=keells&from={month_ago}",
+        f"/export/expenses.parquet?from={month_ago}",
+        f"/export/expenses.arrow?from={month_ago}",
+    ]
+
+
+def percentile(sorted_vals, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_vals:
+        return None
+    k = max(0, math.ceil(pct / 100 * len(sorted_vals)) - 1)
+    return sorted_vals[k]
+
+
+def summarize(samples, wall_seconds):
+    """[(ms, ok, queries)] for one route -> stats dict."""
+    lat = sorted(ms for ms, _, _ in samples)
+    queries = [q for _, _, q in samples if q is not None]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, ok, _ in samples if not ok),
+        "p50_ms": round(percentile(lat, 50), 2),
+        "p95_ms": round(percentile(lat, 95), 2),
+        "p99_ms": round(percentile(lat, 99), 2),
+        "mean_ms": round(sum(lat) / len(lat), 2),
+        "rps": round(len(samples) / wall_seconds, 1) if wall_seconds else None,
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def _run_route(fetch, path, requests, concurrency, warmup):
+    for _ in range(warmup):
+        fetch(path)
+    samples, lock = [], threading.Lock()
+    remaining = [requests]
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            ok, queries = fetch(path)
+            ms = (time.perf_counter() - started) * 1000
+            with lock:
+                samples.append((ms, ok, queries))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as ex:
+        for _ in range(concurrency):
+            ex.submit(worker)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def client_fetcher(app):
+    """fetch(path) -> (ok, queries) through a per-thread Flask test client."""
+    local = threading.local()
+
+    def fetch(path):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        with client:
+            resp = client.get(path)
+            resp.get_data()                       # drain streamed exports
+            queries = g.get("db_queries", 0)
+        return resp.status_code < 400, queries
+    return fetch
+
+
+_SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+def http_fetcher(base_url):
+    """fetch(path) -> (ok, queries) over real HTTP; queries come from the Server-Timing header."""
+    def fetch(path):
+        try:
+            with urllib.request.urlopen(base_url + path, timeout=60) as resp:
+                resp.read()
+                m = _SERVER_TIMING_QUERIES.search(resp.headers.get("Server-Timing", ""))
+                return resp.status < 400, int(m.group(1)) if m else None
+        except urllib.error.URLError:
+            return False, None
+    return fetch
+
+
+def start_http_server(app):
+    """Serve app on an ephemeral 127.0.0.1 port in a background thread; returns (base_url, stop)."""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return f"http://127.0.0.1:{server.server_port}", server.shutdown
+
+
+def run(app_module, transport="client", requests=200, concurrency=4, warmup=5, routes=None, log=print):
+    """Benchmark every route; returns {path: stats}."""
+    app = app_module.app
+    routes = routes or build_routes(app_module)
+    stop = None
+    if transport == "http":
+        base_url, stop = start_http_server(app)
+        fetch = http_fetcher(base_url)
+    else:
+        fetch = client_fetcher(app)
+    results = {}
+    try:
+        for path in routes:
+            results[path] = stats = _run_route(fetch, path, requests, concurrency, warmup)
+            log(f"{path:48s} p50 {stats['p50_ms']:8.2f}ms  p95 {stats['p95_ms']:8.2f}ms  "
+                f"p99 {stats['p99_ms']:8.2f}ms  {stats['rps']:8.1f} req/s  "
+                f"q/req {stats['queries_per_request'] if stats['queries_per_request'] is not None else '-'}"
+                + (f"  errors {stats['errors']}" if stats["errors"] else ""))
+    finally:
+        if stop:
+            stop()
+    return results
+
+
+def compare(base: dict, new: dict, threshold_pct: float = 10.0, log=print):
+    """Print p50/p95 deltas between two result files; returns the routes that regressed."""
+    regressed = []
+    for path, new_stats in new["routes"].items():
+        old_stats = base["routes"].get(path)
+        if not old_stats:
+            log(f"{path:48s} (new)")
+            continue
+        deltas = []
+        for key in ("p50_ms", "p95_ms"):
+            old_v, new_v = old_stats[key], new_stats[key]
+            pct = (new_v - old_v) / old_v * 100 if old_v else 0.0
+            deltas.append(f"{key[:3]} {old_v:8.2f} -> {new_v:8.2f} ({pct:+6.1f}%)")
+            if pct > threshold_pct and path not in regressed:
+                regressed.append(path)
+        log(f"{path:48s} " + "  ".join(deltas) + ("  REGRESSED" if path in regressed else ""))
+    return regressed
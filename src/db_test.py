@@ -1,19 +1,125 @@
+import re
 import pymysql
 
-CFG = {
-    "host": "127.0.0.1",
-    "port": 3306,
-    "user": "expense_user",
-    "password": "StrongPassword123!",   # <-- your real password
-    "database": "expense_db",
-    "cursorclass": pymysql.cursors.DictCursor,
-    "charset": "utf8mb4",
-    "autocommit": True,
+def connect():
+    """Connection for the checks' own SQL: the app's settings (MYWALLET_DB_*), plain DictCursor."""
+    from app import CFG
+    return pymysql.connect(**{**CFG, "cursorclass": pymysql.cursors.DictCursor})
+
+# Statements each page may send once warm (categories cached, pool connected).
+# parallel_queries() statements count one each even though they run side by side.
+QUERY_BUDGET = {
+    "/": 3,
+    "/analytics": 1,
+    "/expenses": 1,
+    "/income": 1,
+    "/expenses?fragment=1": 1,
+    "/api/analytics?days=90&months=24": 2,
 }
 
+def check_query_budget():
+    """Render each page through the app and fail if it needs more round-trips than budgeted."""
+    from flask import g
+    from app import app
+
+    ok = True
+    with app.test_client() as client:
+        for path, budget in QUERY_BUDGET.items():
+            client.get(path)                      # warm the category cache
+            resp = client.get(path)
+            used = g.get("db_queries", 0)
+            passed = resp.status_code == 200 and used <= budget
+            ok = ok and passed
+            print(f"{'OK  ' if passed else 'FAIL'} {path}: {used} queries (budget {budget}, HTTP {resp.status_code})")
+    return ok
+
+# Requests that between them send every SELECT in app.py.
+EXPLAIN_PATHS = [
+    "/", "/analytics",
+    "/expenses", "/expenses?category_id=1", "/expenses?after=2100-01-01_1", "/expenses?before=2000-01-01_1",
+    "/income", "/income?category_id=1", "/income?after=2100-01-01_1", "/income?before=2000-01-01_1",
+    "/api/expenses", "/api/income",
+    "/api/summary", "/api/expense_by_category", "/api/income_by_category",
+    "/api/cashflow_daily", "/api/monthly_totals", "/api/analytics?days=90&months=24",
+    "/api/series?from=2000-01-01", "/api/series?from=2000-01-01&bucket=day",
+    "/api/series?from=2000-01-15&bucket=month", "/api/series?from=2000-01-01&bucket=quarter",
+    "/expenses?q=keells", "/expenses?q=car&category_id=1", "/income?q=salary",
+    "/export/expenses.csv?q=refund", "/export/income.csv?q=bank",
+    "/api/budgets", "/api/budgets?month=2000-01",
+    "/api/archive/totals", "/api/archive/totals?grain=month&year=2000",
+    "/api/changes", "/api/changes.csv", "/api/changes?since=2000-01-01", "/api/changes?since=2000-01-01T00:00:00.000000_2_1",
+    "/export/expenses.csv?from=2000-01-01", "/export/expenses.csv?category_id=1",
+    "/export/income.csv?from=2000-01-01", "/export/income.csv?category_id=1",
+]
+# Tiny lookup tables (and their aliases in app.py) where a full scan is the right plan.
+SCAN_OK = {"categories", "c", "income_categories", "ic"}
+
+# LTTB reference: indices Steinarsson's downsample.js keeps for this input.
+LTTB_INPUT = [0, 1, 5, 2, 8, 3, 3, 9, 1, 0, 4, 7, 2, 6, 0, 1]
+LTTB_EXPECTED = {6: [0, 2, 7, 9, 11, 15], 4: [0, 7, 8, 15]}
+
+def check_lttb():
+    """Compare app.lttb() with known LTTB output (no database needed)."""
+    from app import lttb
+
+    ok = True
+    for threshold, expected in LTTB_EXPECTED.items():
+        got = lttb([LTTB_INPUT], threshold)
+        ok = ok and got == expected
+        print(f"{'OK  ' if got == expected else 'FAIL'} lttb threshold {threshold}: {got} (expected {expected})")
+    return ok
+
+def check_query_plans():
+    """EXPLAIN every SELECT the app sends; fail on full table scans and row filesorts.
+
+    Filesort is allowed for GROUP BY queries, where it only orders the handful
+    of aggregated groups, after a FULLTEXT lookup, where it only orders the
+    matching rows, and over derived tables (<derivedN>/<unionN>), which the
+    change feed builds from already LIMITed branches. Needs realistic data volume: on a near-empty table
+    the optimizer may rightly prefer a scan. The archive tables have no FULLTEXT
+    index, so a ?q= export scans their (date-pruned) partitions with LIKE.
+    """
+    from app import app, query_listeners
+
+    captured = []
+    query_listeners.append(captured.append)
+    try:
+        with app.test_client() as client:
+            for path in EXPLAIN_PATHS:
+                client.get(path).get_data()
+    finally:
+        query_listeners.remove(captured.append)
+
+    statements = []
+    for sql in captured:
+        for stmt in sql.split(";\n"):          # run_batch() joins statements with ";\n"
+            stmt = stmt.strip().rstrip(";")
+            body = re.sub(r"^/\*.*?\*/\s*", "", stmt)   # drop the /* q:name */ tag
+            if body.upper().startswith("SELECT") and stmt not in statements:
+                statements.append(stmt)
+
+    ok = True
+    con = connect()
+    with con.cursor() as cur:
+        for stmt in statements:
+            cur.execute("EXPLAIN " + stmt)
+            problems = []
+            for row in cur.fetchall():
+                archive_search = str(row["table"]).endswith("_archive") and " LIKE " in stmt
+                if row["type"] == "ALL" and row["table"] not in SCAN_OK and not archive_search:
+                    problems.append(f"full scan of {row['table']}")
+                if ("filesort" in (row["Extra"] or "") and "GROUP BY" not in stmt.upper()
+                        and row["type"] != "fulltext" and not str(row["table"]).startswith("<")):
+                    problems.append(f"filesort on {row['table']}")
+            ok = ok and not problems
+            first_line = " ".join(stmt.split())[:100]
+            print(f"{'FAIL' if problems else 'OK  '} {first_line}" + (f"  <- {', '.join(problems)}" if problems else ""))
+    con.close()
+    return ok
+
 def main():
     print("Connecting to MySQL…")
-    con = pymysql.connect(**CFG)
+    con = connect()
     with con.cursor() as cur:
         cur.execute("SELECT VERSION() AS ver")
         print("Server version:", cur.fetchone()["ver"])
@@ -38,5 +144,17 @@ def main():
     con.close()
     print("\nOK: Python can talk to MySQL.")
 
+    print("\nQueries per page:")
+    if not check_query_budget():
+        raise SystemExit("FAIL: a page exceeded its query budget.")
+
+    print("\nDownsampling:")
+    if not check_lttb():
+        raise SystemExit("FAIL: lttb() does not match the reference output.")
+
+    print("\nQuery plans:")
+    if not check_query_plans():
+        raise SystemExit("FAIL: a query falls back to a full scan or filesort.")
+
 if __name__ == "__main__":
     main()
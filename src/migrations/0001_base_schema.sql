@@ -0,0 +1,33 @@
+-- Base tables the app has always assumed. IF NOT EXISTS lets an existing
+-- XAMPP database adopt the migration history without changes.
+
+CREATE TABLE IF NOT EXISTS categories (
+    id   INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(80) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS income_categories (
+    id   INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(80) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS expenses (
+    id             INT AUTO_INCREMENT PRIMARY KEY,
+    tx_date        DATE NOT NULL,
+    category_id    INT NOT NULL,
+    amount         DECIMAL(12,2) NOT NULL,
+    payment_method VARCHAR(20) NULL,
+    merchant       VARCHAR(120) NULL,
+    note           VARCHAR(255) NULL,
+    CONSTRAINT fk_expenses_category FOREIGN KEY (category_id) REFERENCES categories (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS incomes (
+    id          INT AUTO_INCREMENT PRIMARY KEY,
+    tx_date     DATE NOT NULL,
+    category_id INT NOT NULL,
+    amount      DECIMAL(12,2) NOT NULL,
+    source      VARCHAR(120) NULL,
+    note        VARCHAR(255) NULL,
+    CONSTRAINT fk_incomes_category FOREIGN KEY (category_id) REFERENCES income_categories (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,18 @@
+-- Indexes shaped after the app's queries. InnoDB appends the primary key to
+-- every secondary index, so each one below already ends in `id`.
+--
+-- (tx_date, id)               date-range filters ordered by tx_date, id: list pages
+--                             (keyset seek), dashboard "recent" lists, CSV exports,
+--                             daily_totals rebuild.
+-- (category_id, tx_date, id)  the same shapes with a category filter; also serves
+--                             the category foreign key.
+-- name (on categories)        covering for `SELECT id, name ... ORDER BY name`
+--                             (no filesort) and the by-name lookups in seeding/import.
+
+ALTER TABLE expenses ADD INDEX ix_expenses_date_id (tx_date, id);
+ALTER TABLE expenses ADD INDEX ix_expenses_cat_date_id (category_id, tx_date, id);
+ALTER TABLE incomes  ADD INDEX ix_incomes_date_id (tx_date, id);
+ALTER TABLE incomes  ADD INDEX ix_incomes_cat_date_id (category_id, tx_date, id);
+
+ALTER TABLE categories        ADD INDEX ix_categories_name (name);
+ALTER TABLE income_categories ADD INDEX ix_income_categories_name (name);
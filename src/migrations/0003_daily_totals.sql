@@ -0,0 +1,23 @@
+-- Per (kind, day, category) rollup kept in step by the write routes.
+-- The clustered primary key holds total/tx_count, so every aggregate read is a
+-- primary-key range scan that never touches expenses/incomes.
+
+CREATE TABLE IF NOT EXISTS daily_totals (
+    tx_date     DATE NOT NULL,
+    kind        ENUM('expense','income') NOT NULL,
+    category_id INT NOT NULL,
+    total       DECIMAL(14,2) NOT NULL DEFAULT 0,
+    tx_count    INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, tx_date, category_id)
+) ENGINE=InnoDB;
+
+-- Backfill (a full rebuild, so it is safe if the table was already populated).
+DELETE FROM daily_totals;
+
+INSERT INTO daily_totals (tx_date, kind, category_id, total, tx_count)
+SELECT tx_date, 'expense', category_id, SUM(amount), COUNT(*)
+FROM expenses GROUP BY tx_date, category_id;
+
+INSERT INTO daily_totals (tx_date, kind, category_id, total, tx_count)
+SELECT tx_date, 'income', category_id, SUM(amount), COUNT(*)
+FROM incomes GROUP BY tx_date, category_id;
@@ -0,0 +1,5 @@
+-- Full-text indexes behind the ?q= search on the lists, JSON APIs and CSV exports.
+-- InnoDB FULLTEXT needs MySQL 5.6+ / MariaDB 10.0.5+ (any current XAMPP).
+-- The column lists must match SEARCH_COLUMNS in app.py.
+ALTER TABLE expenses ADD FULLTEXT INDEX ft_expenses_text (merchant, note);
+ALTER TABLE incomes ADD FULLTEXT INDEX ft_incomes_text (source, note);
@@ -0,0 +1,24 @@
+-- Monthly budget per expense category, and the month-to-date spend counter it
+-- is checked against. The write routes adjust category_month_spend in the same
+-- transaction as the expense; `flask reconcile-budgets` repairs drift.
+
+CREATE TABLE IF NOT EXISTS budgets (
+    category_id   INT NOT NULL PRIMARY KEY,
+    monthly_limit DECIMAL(14,2) NOT NULL,
+    CONSTRAINT fk_budgets_category FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS category_month_spend (
+    month       DATE NOT NULL,              -- first day of the month
+    category_id INT NOT NULL,
+    spent       DECIMAL(14,2) NOT NULL DEFAULT 0,
+    tx_count    INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, category_id)
+) ENGINE=InnoDB;
+
+-- Backfill (a full rebuild, so it is safe if the table was already populated).
+DELETE FROM category_month_spend;
+
+INSERT INTO category_month_spend (month, category_id, spent, tx_count)
+SELECT DATE_SUB(tx_date, INTERVAL (DAYOFMONTH(tx_date) - 1) DAY), category_id, SUM(amount), COUNT(*)
+FROM expenses GROUP BY 1, 2;
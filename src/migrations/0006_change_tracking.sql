@@ -0,0 +1,19 @@
+-- Change tracking for incremental (Power BI) refresh through /api/changes.
+-- updated_at is set on insert and on every UPDATE, including edits made
+-- outside the app; existing rows get the migration time. Deletes made by
+-- the app leave a tombstone in deleted_rows.
+
+ALTER TABLE expenses ADD COLUMN updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+ALTER TABLE incomes ADD COLUMN updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+
+-- (updated_at, id): the change feed's keyset order
+CREATE INDEX ix_expenses_updated_id ON expenses (updated_at, id);
+CREATE INDEX ix_incomes_updated_id ON incomes (updated_at, id);
+
+CREATE TABLE IF NOT EXISTS deleted_rows (
+    id         BIGINT AUTO_INCREMENT PRIMARY KEY,
+    kind       ENUM('expense','income') NOT NULL,
+    row_id     INT NOT NULL,
+    deleted_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    KEY ix_deleted_rows_at_id (deleted_at, id)
+) ENGINE=InnoDB;
@@ -0,0 +1,10 @@
+-- Client-supplied idempotency keys for /api/transactions/batch. A replayed
+-- record finds its key already stored and is reported as a duplicate instead
+-- of being inserted twice. Rows entered through the forms keep NULL, which a
+-- UNIQUE index allows any number of times.
+
+ALTER TABLE expenses ADD COLUMN client_key VARCHAR(64) NULL;
+ALTER TABLE incomes ADD COLUMN client_key VARCHAR(64) NULL;
+
+CREATE UNIQUE INDEX ux_expenses_client_key ON expenses (client_key);
+CREATE UNIQUE INDEX ux_incomes_client_key ON incomes (client_key);
@@ -0,0 +1,65 @@
+-- Cold storage for closed years, filled by `flask archive`.
+--
+-- expenses/incomes themselves cannot be partitioned: InnoDB partitioned
+-- tables allow no foreign keys, no FULLTEXT indexes (0004) and no unique key
+-- without the partitioning column (the id primary key, client_key from 0007).
+-- Closed years are moved instead into these copies, RANGE-partitioned on
+-- tx_date by year. The archive command adds one partition per archived year
+-- by splitting p_future, so date-bounded reads prune to the years they touch.
+-- The primary key leads with tx_date because every unique key of a
+-- partitioned table must contain the partitioning column.
+
+CREATE TABLE IF NOT EXISTS expenses_archive (
+    id             INT NOT NULL,
+    tx_date        DATE NOT NULL,
+    category_id    INT NOT NULL,
+    amount         DECIMAL(12,2) NOT NULL,
+    payment_method VARCHAR(20) NULL,
+    merchant       VARCHAR(120) NULL,
+    note           VARCHAR(255) NULL,
+    client_key     VARCHAR(64) NULL,
+    archived_at    TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (tx_date, id),
+    KEY ix_expenses_archive_cat_date (category_id, tx_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY RANGE COLUMNS (tx_date) (
+    PARTITION p_start  VALUES LESS THAN ('1970-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
+
+CREATE TABLE IF NOT EXISTS incomes_archive (
+    id          INT NOT NULL,
+    tx_date     DATE NOT NULL,
+    category_id INT NOT NULL,
+    amount      DECIMAL(12,2) NOT NULL,
+    source      VARCHAR(120) NULL,
+    note        VARCHAR(255) NULL,
+    client_key  VARCHAR(64) NULL,
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (tx_date, id),
+    KEY ix_incomes_archive_cat_date (category_id, tx_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY RANGE COLUMNS (tx_date) (
+    PARTITION p_start  VALUES LESS THAN ('1970-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
+
+-- Per (month or year, kind, category) sums of the archived rows, rewritten
+-- for a year each time it is archived; /api/archive/totals reads them. The
+-- app's charts and totals keep reading daily_totals, which covers every year.
+CREATE TABLE IF NOT EXISTS archive_totals (
+    grain        ENUM('month','year') NOT NULL,
+    period_start DATE NOT NULL,
+    kind         ENUM('expense','income') NOT NULL,
+    category_id  INT NOT NULL,
+    total        DECIMAL(14,2) NOT NULL,
+    tx_count     INT NOT NULL,
+    PRIMARY KEY (grain, period_start, kind, category_id)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS archived_years (
+    year         SMALLINT NOT NULL PRIMARY KEY,
+    expense_rows INT NOT NULL,
+    income_rows  INT NOT NULL,
+    archived_at  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
@@ -0,0 +1,13 @@
+-- Shared data version behind the /api/* ETags and response cache.
+-- transaction() bumps the counter in the same commit as every write, so
+-- writes from CLI commands and other server processes invalidate the cache
+-- too. epoch is fixed when the row is created; it keeps ETags from a
+-- recreated database from matching the old one's.
+
+CREATE TABLE IF NOT EXISTS data_version (
+    id      TINYINT NOT NULL PRIMARY KEY,
+    epoch   CHAR(8) NOT NULL,
+    version BIGINT UNSIGNED NOT NULL
+) ENGINE=InnoDB;
+
+INSERT IGNORE INTO data_version (id, epoch, version) VALUES (1, LEFT(MD5(UUID()), 8), 0);
@@ -0,0 +1,61 @@
+// Filter forms marked data-fragment="#id" (and pager links inside that
+// element) fetch only the table: the request carries X-Fragment: 1, the
+// server renders just the partial, and it replaces the element in place.
+// Without JS the forms and links still work as full page loads.
+(function () {
+  var swapped = false;
+
+  function load(target, url) {
+    target.classList.add("opacity-50");
+    fetch(url, { headers: { "X-Fragment": "1" } })
+      .then(function (r) {
+        if (!r.ok) throw new Error("HTTP " + r.status);
+        return r.text();
+      })
+      .then(function (html) {
+        var tpl = document.createElement("template");
+        tpl.innerHTML = html.trim();
+        var fresh = tpl.content.querySelector("[data-fragment-root]");
+        if (!fresh) throw new Error("no fragment in response");
+        target.replaceWith(fresh);
+        // labels outside the fragment that mirror a value inside it
+        document.querySelectorAll("[data-sync]").forEach(function (el) {
+          if (fresh.contains(el)) return;
+          var src = fresh.querySelector('[data-sync="' + el.dataset.sync + '"]');
+          if (src) el.textContent = src.textContent;
+        });
+        history.pushState({ fragment: fresh.id }, "", url);
+        swapped = true;
+      })
+      .catch(function () { location.href = url; });
+  }
+
+  document.addEventListener("submit", function (e) {
+    var form = e.target;
+    var target = form.dataset.fragment && document.querySelector(form.dataset.fragment);
+    if (!target || form.method.toLowerCase() !== "get") return;
+    e.preventDefault();
+    var params = new URLSearchParams(new FormData(form));
+    var filled = new URLSearchParams();
+    params.forEach(function (v, k) { if (v !== "") filled.append(k, v); });
+    // export links carry the filters too
+    form.querySelectorAll("a[data-export]").forEach(function (a) {
+      a.href = a.dataset.export + (filled.toString() ? "?" + filled : "");
+    });
+    load(target, form.action.split("?")[0] + "?" + params);
+  });
+
+  document.addEventListener("click", function (e) {
+    var a = e.target.closest("a[data-fragment-link]");
+    if (!a || a.classList.contains("disabled") || e.ctrlKey || e.metaKey || e.shiftKey || e.button !== 0) return;
+    var target = a.closest("[data-fragment-root]");
+    if (!target) return;
+    e.preventDefault();
+    load(target, a.href);
+  });
+
+  // back/forward after a swap: the page the browser has is no longer what the URL shows
+  window.addEventListener("popstate", function () {
+    if (swapped) location.reload();
+  });
+})();
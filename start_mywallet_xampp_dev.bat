@@ -51,12 +51,21 @@ REM --- background waiter to open browser AFTER 5000 is live ---
 powershell -NoProfile -WindowStyle Hidden -Command ^
   "for($i=0;$i -lt 60;$i++){try{$c=New-Object Net.Sockets.TcpClient;$c.Connect('127.0.0.1',%APPPORT%);if($c.Connected){Start-Process 'http://127.0.0.1:%APPPORT%/';break}}catch{}finally{if($c){$c.Close()}};Start-Sleep -Milliseconds 500}"
 
+REM --- "start_mywallet_xampp_dev.bat prod" serves with waitress instead ---
+set "FLASK_APP=src.app"
+if /i "%~1"=="prod" (
+  set "MYWALLET_DEBUG=0"
+  "%PY%" -m flask serve --host 127.0.0.1 --port %APPPORT%
+  goto :done
+)
+
 REM --- run Flask with reloader (dev mode) ---
 set "MYWALLET_DEBUG=1"
-set "FLASK_APP=src.app"
 set "FLASK_RUN_HOST=127.0.0.1"
 set "FLASK_RUN_PORT=%APPPORT%"
 
 "%PY%" -m flask run --debug
 
+:done
+
 endlocal